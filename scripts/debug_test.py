@@ -0,0 +1,10 @@
+from tenlib.processor.chunker.models import ChunkConfig, BoundaryType
+from tenlib.processor.chunker.detector import BoundaryDetector
+from tenlib.processor.chunker.token_estimator import SimpleTokenEstimator
+
+
+if __name__ == "__main__":
+    c = ChunkConfig()
+    d = BoundaryDetector(c, SimpleTokenEstimator())
+    for p in d._compiled[BoundaryType.CHAPTER]:
+        print(p.pattern, p.match("Capítulo 1"))
@@ -14,31 +14,79 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from typing import Iterator
 from difflib import SequenceMatcher
 from pathlib import Path
 
 from tenlib.context.bible import BibleUpdate, BookBible
-from tenlib.context.character_detector import extract_character_mentions
+from tenlib.context.character_detector import (
+    collect_character_candidates,
+    rank_character_candidates,
+)
 from tenlib.context.compressor import BibleCompressor
 
+try:
+    # rapidfuzz es opcional: si está instalado el matching fuzzy corre en C.
+    import numpy as np
+    from rapidfuzz import fuzz, process
+except ImportError:
+    process = None
+
+try:
+    # scipy (opcional) permite la asignación 1:1 óptima en vez de greedy.
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+try:
+    # datasketch (opcional) evita comparar todos los pares en elencos enormes.
+    # Es aproximado: solo se usa con --fuzzy-lsh o si falta rapidfuzz.
+    from datasketch import MinHash, MinHashLSH
+except ImportError:
+    MinHashLSH = None
+
+# Sin rapidfuzz, a partir de cuántos pares pred x gold conviene filtrar
+# candidatos con LSH en vez de recorrerlos todos con difflib.
+_LSH_MIN_PAIRS = 250_000
+_LSH_NUM_PERM = 64
+
+# Por debajo de cuántos chunks la detección corre en este proceso: arrancar
+# el pool y serializar texto y resultados cuesta más que el recorrido.
+_PARALLEL_MIN_CHUNKS = 64
+# Tope de procesos del pool (cada uno reimporta tenlib al arrancar).
+_MAX_WORKERS = 8
+
 
 @dataclass
 class EvalSnapshot:
-    characters: set[str]
+    characters: frozenset[str]
     bible_characters: int
     avg_prompt_chars: float
     max_prompt_chars: int
 
 
+# Un bloque = líneas consecutivas sin una línea en blanco entre ellas.
+_BLOCK_RE = re.compile(r"[^\n]+(?:\n(?!\s*\n)[^\n]+)*")
+
+
+def _iter_blocks(text: str) -> Iterator[str]:
+    for match in _BLOCK_RE.finditer(text):
+        block = match.group(0).strip()
+        if block:
+            yield block
+
+
 def _chunk_by_paragraphs(text: str, target_chars: int) -> list[str]:
-    blocks = [b.strip() for b in re.split(r"\n\s*\n", text) if b.strip()]
     chunks: list[str] = []
     buf: list[str] = []
     current = 0
 
-    for block in blocks:
+    for block in _iter_blocks(text):
         add = len(block) + (2 if buf else 0)
         if buf and current + add > target_chars:
             chunks.append("\n\n".join(buf))
@@ -53,42 +101,63 @@ def _chunk_by_paragraphs(text: str, target_chars: int) -> list[str]:
     return chunks
 
 
+def _collect_candidates(chunk: str):
+    return collect_character_candidates(source_text="", translated_text=chunk)
+
+
 def _evaluate_text(text: str, chunk_chars: int, max_chars_per_chunk: int) -> EvalSnapshot:
     chunks = _chunk_by_paragraphs(text, target_chars=chunk_chars)
     compressor = BibleCompressor()
     bible = BookBible.empty()
-    prompt_sizes: list[int] = []
+    prompt_sizes = [0] * len(chunks)
+
+    # Map: la detección cruda no depende de la Bible, se reparte entre procesos.
+    # Reduce: el ranking con personajes conocidos y el merge siguen en orden.
+    workers = min(os.cpu_count() or 1, _MAX_WORKERS)
+    if workers == 1 or len(chunks) < _PARALLEL_MIN_CHUNKS:
+        candidates_per_chunk = [_collect_candidates(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            candidates_per_chunk = list(
+                executor.map(_collect_candidates, chunks, chunksize=8)
+            )
 
-    for chunk in chunks:
+    for i, (chunk, candidates) in enumerate(zip(chunks, candidates_per_chunk)):
         update = BibleUpdate(
-            characters=extract_character_mentions(
-                source_text="",
-                translated_text=chunk,
+            characters=rank_character_candidates(
+                candidates,
                 max_characters=max_chars_per_chunk,
                 existing_characters=bible.characters,
+                existing_characters_index=bible.character_name_index(),
             ),
             last_scene=chunk[:280],
         )
         bible.apply(update)
         compressed = compressor.compress(bible, chunk)
-        prompt_sizes.append(len(compressed.to_json()))
+        # Sangrado: mantiene comparables los tamaños con reportes anteriores.
+        prompt_sizes[i] = compressed.json_size(pretty=True)
 
     avg_prompt = (sum(prompt_sizes) / len(prompt_sizes)) if prompt_sizes else 0.0
     max_prompt = max(prompt_sizes) if prompt_sizes else 0
     return EvalSnapshot(
-        characters=set(bible.characters.keys()),
+        characters=frozenset(bible.characters),
         bible_characters=len(bible.characters),
         avg_prompt_chars=avg_prompt,
         max_prompt_chars=max_prompt,
     )
 
 
-def _exact_metrics(gold: set[str], pred: set[str]) -> dict[str, float]:
+def _exact_metrics(
+    gold: frozenset[str], pred: frozenset[str]
+) -> tuple[dict[str, float], frozenset[str], frozenset[str]]:
+    """Devuelve las métricas junto con los sobrantes (pred - gold) y faltantes (gold - pred)."""
     inter = gold & pred
+    extra = pred - inter
+    missing = gold - inter
     precision = len(inter) / len(pred) if pred else 0.0
     recall = len(inter) / len(gold) if gold else 0.0
     f1 = (2 * precision * recall / (precision + recall)) if (precision + recall) else 0.0
-    return {
+    metrics = {
         "precision": precision,
         "recall": recall,
         "f1": f1,
@@ -96,22 +165,38 @@ def _exact_metrics(gold: set[str], pred: set[str]) -> dict[str, float]:
         "pred": len(pred),
         "gold": len(gold),
     }
+    return metrics, extra, missing
 
 
-def _fuzzy_metrics(gold: set[str], pred: set[str], threshold: float) -> dict[str, float]:
-    gold_left = set(gold)
-    tp = 0
-    for cand in pred:
-        best = None
-        best_score = 0.0
-        for ref in gold_left:
-            score = SequenceMatcher(None, cand.lower(), ref.lower()).ratio()
-            if score > best_score:
-                best_score = score
-                best = ref
-        if best is not None and best_score >= threshold:
-            tp += 1
-            gold_left.remove(best)
+def _fuzzy_metrics(
+    gold: frozenset[str],
+    pred: frozenset[str],
+    threshold: float,
+    use_lsh: bool = False,
+) -> dict[str, float]:
+    if not gold or not pred:
+        return {
+            "precision": 0.0,
+            "recall": 0.0,
+            "f1": 0.0,
+            "tp": 0,
+            "pred": len(pred),
+            "gold": len(gold),
+            "threshold": threshold,
+            "backend": None,
+        }
+
+    # El backend queda en el reporte: greedy y óptimo pueden dar tp distintos.
+    large = len(gold) * len(pred) >= _LSH_MIN_PAIRS
+    if MinHashLSH is not None and (use_lsh or (process is None and large)):
+        backend = "lsh-greedy"
+        tp = _fuzzy_tp_lsh(sorted(gold), sorted(pred), threshold)
+    elif process is not None:
+        backend = "rapidfuzz-" + ("hungarian" if linear_sum_assignment is not None else "greedy")
+        tp = _fuzzy_tp_rapidfuzz(sorted(gold), sorted(pred), threshold)
+    else:
+        backend = "difflib-greedy"
+        tp = _fuzzy_tp_difflib(gold, pred, threshold)
 
     precision = tp / len(pred) if pred else 0.0
     recall = tp / len(gold) if gold else 0.0
@@ -124,9 +209,147 @@ def _fuzzy_metrics(gold: set[str], pred: set[str], threshold: float) -> dict[str
         "pred": len(pred),
         "gold": len(gold),
         "threshold": threshold,
+        "backend": backend,
     }
 
 
+def _fuzzy_tp_rapidfuzz(gold: list[str], pred: list[str], threshold: float) -> int:
+    """
+    Calcula toda la matriz pred x gold en una sola llamada a rapidfuzz.
+    tp es el número de pares emparejados sobre el umbral, así que la
+    asignación 1:1 óptima (algoritmo húngaro, si scipy está disponible) se
+    hace sobre la matriz binaria `scores >= cutoff`: maximizar la suma de
+    scores podría preferir menos pares con más puntuación. Sin scipy es
+    greedy por fila, quedándose con el mejor score disponible.
+    """
+    cutoff = threshold * 100
+    scores = process.cdist(
+        [p.lower() for p in pred],
+        [g.lower() for g in gold],
+        scorer=fuzz.ratio,
+        score_cutoff=cutoff,
+        workers=-1,
+        dtype=np.float32,
+    )
+    matches = scores >= cutoff
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(matches, maximize=True)
+        return int(np.count_nonzero(matches[rows, cols]))
+
+    used = np.zeros(len(gold), dtype=bool)
+    tp = 0
+    for row, row_matches in zip(scores, matches):
+        available = row_matches & ~used
+        if available.any():
+            used[int(np.where(available, row, -1).argmax())] = True
+            tp += 1
+    return tp
+
+
+def _fuzzy_tp_difflib(gold: set[str], pred: set[str], threshold: float) -> int:
+    """
+    Fallback sin rapidfuzz. Cada referencia tiene su propio SequenceMatcher
+    (b2j y el conteo de caracteres de b se construyen una sola vez y se
+    reutilizan para todos los candidatos) y las cotas baratas de difflib
+    descartan los pares que no pueden superar al mejor actual ni al umbral
+    antes de calcular ratio().
+
+    Antes de tocar difflib se aplica una cota entera con longitudes y máscaras
+    de letras: cada letra distinta de un lado que no existe en el otro es al
+    menos un carácter que nunca podrá emparejarse.
+    """
+    pred_lc = [c.lower() for c in pred]
+    gold_lc = [g.lower() for g in gold]
+    gold_len = [len(g) for g in gold_lc]
+    gold_mask = [_letter_mask(g) for g in gold_lc]
+    used = [False] * len(gold_lc)
+    matchers: list[SequenceMatcher | None] = [None] * len(gold_lc)
+    tp = 0
+    for cand in pred_lc:
+        cand_len = len(cand)
+        cand_mask = _letter_mask(cand)
+        best = -1
+        best_score = 0.0
+        for j, ref in enumerate(gold_lc):
+            if used[j]:
+                continue
+            floor = max(best_score, threshold)
+            ref_len, ref_mask = gold_len[j], gold_mask[j]
+            max_matches = min(
+                cand_len - (cand_mask & ~ref_mask).bit_count(),
+                ref_len - (ref_mask & ~cand_mask).bit_count(),
+            )
+            if 2 * max_matches < floor * (cand_len + ref_len):
+                continue
+            sm = matchers[j]
+            if sm is None:
+                sm = matchers[j] = SequenceMatcher(None, b=ref, autojunk=False)
+            sm.set_seq1(cand)
+            if sm.real_quick_ratio() < floor or sm.quick_ratio() < floor:
+                continue
+            score = sm.ratio()
+            if score > best_score:
+                best_score = score
+                best = j
+        if best >= 0 and best_score >= threshold:
+            tp += 1
+            used[best] = True
+    return tp
+
+
+def _fuzzy_tp_lsh(gold: list[str], pred: list[str], threshold: float) -> int:
+    """
+    Variante para elencos muy grandes: indexa los trigramas de gold en un
+    MinHash-LSH una sola vez y solo calcula el ratio exacto contra la lista
+    corta que devuelve cada consulta. Es aproximada: el LSH usa un umbral
+    algo más laxo que el fuzzy para no perder pares válidos.
+    """
+    gold_lc = [g.lower() for g in gold]
+    lsh = MinHashLSH(threshold=max(threshold - 0.3, 0.1), num_perm=_LSH_NUM_PERM)
+    for j, ref in enumerate(gold_lc):
+        lsh.insert(j, _trigram_minhash(ref))
+
+    used = [False] * len(gold_lc)
+    tp = 0
+    for cand in (p.lower() for p in pred):
+        best = -1
+        best_score = 0.0
+        for j in sorted(lsh.query(_trigram_minhash(cand))):
+            if used[j]:
+                continue
+            score = _pair_ratio(cand, gold_lc[j])
+            if score > best_score:
+                best_score = score
+                best = j
+        if best >= 0 and best_score >= threshold:
+            tp += 1
+            used[best] = True
+    return tp
+
+
+def _trigram_minhash(text: str) -> "MinHash":
+    grams = {text[i:i + 3] for i in range(len(text) - 2)} or {text}
+    minhash = MinHash(num_perm=_LSH_NUM_PERM)
+    for gram in grams:
+        minhash.update(gram.encode("utf-8"))
+    return minhash
+
+
+def _pair_ratio(a: str, b: str) -> float:
+    if process is not None:
+        return fuzz.ratio(a, b) / 100
+    return SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def _letter_mask(text: str) -> int:
+    """Bit i encendido si la letra ASCII chr(97 + i) aparece en text (ya en minúsculas)."""
+    mask = 0
+    for ch in text:
+        if "a" <= ch <= "z":
+            mask |= 1 << (ord(ch) - 97)
+    return mask
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Eval Bible/characters para par bueno-malo")
     parser.add_argument("--good", required=True, help="Ruta al txt bueno (referencia)")
@@ -134,10 +357,15 @@ def main() -> None:
     parser.add_argument("--chunk-chars", type=int, default=1200, help="Tamaño objetivo de chunk")
     parser.add_argument("--max-characters-per-chunk", type=int, default=40, help="Top personajes por chunk")
     parser.add_argument("--fuzzy-threshold", type=float, default=0.84, help="Umbral fuzzy 0..1")
+    parser.add_argument(
+        "--fuzzy-lsh",
+        action="store_true",
+        help="Métricas fuzzy aproximadas con MinHash-LSH (requiere datasketch)",
+    )
     args = parser.parse_args()
 
-    good_text = Path(args.good).read_text(encoding="utf-8", errors="ignore")
-    bad_text = Path(args.bad).read_text(encoding="utf-8", errors="ignore")
+    good_text = Path(args.good).read_bytes().decode("utf-8", "ignore")
+    bad_text = Path(args.bad).read_bytes().decode("utf-8", "ignore")
 
     good_eval = _evaluate_text(
         text=good_text,
@@ -150,8 +378,13 @@ def main() -> None:
         max_chars_per_chunk=args.max_characters_per_chunk,
     )
 
-    exact = _exact_metrics(good_eval.characters, bad_eval.characters)
-    fuzzy = _fuzzy_metrics(good_eval.characters, bad_eval.characters, args.fuzzy_threshold)
+    exact, extra_in_bad, missing_in_bad = _exact_metrics(good_eval.characters, bad_eval.characters)
+    fuzzy = _fuzzy_metrics(
+        good_eval.characters,
+        bad_eval.characters,
+        args.fuzzy_threshold,
+        use_lsh=args.fuzzy_lsh,
+    )
 
     report = {
         "good": {
@@ -168,13 +401,14 @@ def main() -> None:
         },
         "metrics_exact": {
             **{k: (round(v, 4) if isinstance(v, float) else v) for k, v in exact.items()},
-            "extra_in_bad": sorted(bad_eval.characters - good_eval.characters),
-            "missing_in_bad": sorted(good_eval.characters - bad_eval.characters),
+            "extra_in_bad": sorted(extra_in_bad),
+            "missing_in_bad": sorted(missing_in_bad),
         },
         "metrics_fuzzy": {k: (round(v, 4) if isinstance(v, float) else v) for k, v in fuzzy.items()},
     }
 
-    print(json.dumps(report, ensure_ascii=False, indent=2))
+    json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
 
 
 if __name__ == "__main__":
@@ -1,18 +1,14 @@
 # tenlib/cli.py
+import os
+import stat
 import sys
-import click
-from dotenv import load_dotenv
-
-from tenlib.factory import build_orchestrator
-from tenlib.orchestrator import BookAlreadyDoneError
-from tenlib.router.router import AllModelsExhaustedError
 
+import click
 
-# Carga .env una sola vez, antes que cualquier otra cosa
-load_dotenv()
 
 # Extensiones soportadas
 _SUPPORTED_FORMATS = {".epub", ".txt", ".md", ".pdf"}
+_SUPPORTED_FORMATS_DISPLAY = ", ".join(sorted(_SUPPORTED_FORMATS))
 
 
 # ------------------------------------------------------------------
@@ -28,6 +24,19 @@ def main():
     Traduce, corrige y escribe libros completos con IA,
     preservando coherencia y optimizando el uso de tokens.
     """
+    # Carga .env solo cuando se va a ejecutar un comando:
+    # --help y --version salen antes de llegar aquí.
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+def build_orchestrator(**kwargs):
+    """
+    Import diferido del pipeline completo (router, modelos, storage...).
+    Mantiene `tenlib --help` rápido y sigue siendo el punto a parchear en tests.
+    """
+    from tenlib.factory import build_orchestrator as _build_orchestrator
+    return _build_orchestrator(**kwargs)
 
 
 # ------------------------------------------------------------------
@@ -60,20 +69,32 @@ def main():
     type         = click.Choice(["standard", "large", "xlarge"], case_sensitive=False),
     help         = "Tamaño de los chunks: standard (800-2000), large (1200-3500), xlarge (2000-5000 tokens)",
 )
-def translate(book: str, source_lang: str, target_lang: str, chunk_size: str):
+@click.option(
+    "--max-in-flight",
+    default      = 1,
+    show_default = True,
+    type         = click.IntRange(min=1),
+    help         = "Chunks traducidos en paralelo (1 = secuencial, máxima coherencia de la Bible)",
+)
+def translate(book: str, source_lang: str, target_lang: str, chunk_size: str, max_in_flight: int):
     """Traduce un libro completo preservando voz narrativa y coherencia."""
+    from tenlib.orchestrator import BookAlreadyDoneError
+    from tenlib.router.router import AllModelsExhaustedError
 
     # ── Validaciones de entrada ───────────────────────────────────
     _validate_file(book)
     _validate_lang(source_lang, "--from")
     _validate_lang(target_lang, "--to")
 
-    if source_lang.lower() == target_lang.lower():
+    source_lang = _normalize_lang(source_lang)
+    target_lang = _normalize_lang(target_lang)
+
+    if source_lang == target_lang:
         _abort("El idioma de origen y destino no pueden ser el mismo.")
 
     # ── Ensamblar pipeline ────────────────────────────────────────
     try:
-        orchestrator = build_orchestrator(chunk_size=chunk_size)
+        orchestrator = build_orchestrator(chunk_size=chunk_size, max_in_flight=max_in_flight)
     except FileNotFoundError as e:
         _abort(str(e))
     except RuntimeError as e:
@@ -83,8 +104,8 @@ def translate(book: str, source_lang: str, target_lang: str, chunk_size: str):
     try:
         result = orchestrator.run(
             file_path   = book,
-            source_lang = source_lang.lower(),
-            target_lang = target_lang.lower(),
+            source_lang = source_lang,
+            target_lang = target_lang,
         )
 
     except BookAlreadyDoneError:
@@ -117,6 +138,9 @@ def translate(book: str, source_lang: str, target_lang: str, chunk_size: str):
         )
         sys.exit(1)
 
+    finally:
+        orchestrator.close()
+
     # ── Resumen final ─────────────────────────────────────────────
     _print_summary(result)
 
@@ -158,27 +182,47 @@ def translate(book: str, source_lang: str, target_lang: str, chunk_size: str):
     type         = click.Choice(["standard", "large", "xlarge"], case_sensitive=False),
     help         = "Tamaño de los chunks: standard (800-2000), large (1200-3500), xlarge (2000-5000 tokens)",
 )
-def fix(translation: str, original: str | None, target_lang: str, source_lang: str, chunk_size: str):
+@click.option(
+    "--max-in-flight",
+    default      = 1,
+    show_default = True,
+    type         = click.IntRange(min=1),
+    help         = "Chunks traducidos en paralelo (1 = secuencial, máxima coherencia de la Bible)",
+)
+def fix(
+    translation:   str,
+    original:      str | None,
+    target_lang:   str,
+    source_lang:   str,
+    chunk_size:    str,
+    max_in_flight: int,
+):
     """
     Corrige una traducción existente.
     - Con --original: corrección contra referencia.
     - Sin --original: fix-style (mejora fluidez/sintaxis sin referencia).
     """
+    from tenlib.orchestrator import BookAlreadyDoneError
+    from tenlib.router.router import AllModelsExhaustedError
+
     _validate_file(translation)
     if original:
         _validate_file(original)
     _validate_lang(target_lang, "--to")
     _validate_lang(source_lang, "--from")
 
+    source_lang = _normalize_lang(source_lang)
+    target_lang = _normalize_lang(target_lang)
+
     if (
         original
-        and source_lang.lower() != "auto"
-        and source_lang.lower() == target_lang.lower()
+        and source_lang != "auto"
+        and source_lang == target_lang
     ):
         _abort("El idioma de origen y destino no pueden ser el mismo.")
 
     try:
-        orchestrator = build_orchestrator(chunk_size=chunk_size)
+        orchestrator = build_orchestrator(chunk_size=chunk_size, max_in_flight=max_in_flight)
     except FileNotFoundError as e:
         _abort(str(e))
     except RuntimeError as e:
@@ -189,14 +233,14 @@ def fix(translation: str, original: str | None, target_lang: str, source_lang: s
             result = orchestrator.run_fix(
                 original_path    = original,
                 translation_path = translation,
-                source_lang      = source_lang.lower(),
-                target_lang      = target_lang.lower(),
+                source_lang      = source_lang,
+                target_lang      = target_lang,
             )
         else:
             result = orchestrator.run_fix_style(
                 translation_path = translation,
-                source_lang      = source_lang.lower(),
-                target_lang      = target_lang.lower(),
+                source_lang      = source_lang,
+                target_lang      = target_lang,
             )
 
     except BookAlreadyDoneError:
@@ -229,6 +273,9 @@ def fix(translation: str, original: str | None, target_lang: str, source_lang: s
         )
         sys.exit(1)
 
+    finally:
+        orchestrator.close()
+
     _print_summary(result)
 
 
@@ -257,24 +304,30 @@ def write(outline: str):
 
 def _validate_file(path: str) -> None:
     """Verifica existencia y formato del archivo."""
-    from pathlib import Path
-
-    p = Path(path)
-
-    if not p.exists():
+    exists, is_file, suffix = _classify_path(path)
+    if not exists:
         _abort(f"Archivo no encontrado: {path}")
 
-    if not p.is_file():
+    if not is_file:
         _abort(f"La ruta no es un archivo: {path}")
 
-    if p.suffix.lower() not in _SUPPORTED_FORMATS:
-        supported = ", ".join(sorted(_SUPPORTED_FORMATS))
+    if suffix.lower() not in _SUPPORTED_FORMATS:
         _abort(
-            f"Formato no soportado: '{p.suffix}'\n"
-            f"Formatos disponibles: {supported}"
+            f"Formato no soportado: '{suffix}'\n"
+            f"Formatos disponibles: {_SUPPORTED_FORMATS_DISPLAY}"
         )
 
 
+def _classify_path(path: str) -> tuple[bool, bool, str]:
+    """(existe, es_archivo, extensión) con un solo stat."""
+    suffix = sys.intern(os.path.splitext(path)[1])
+    try:
+        mode = os.stat(path).st_mode
+    except OSError:
+        return False, False, suffix
+    return True, stat.S_ISREG(mode), suffix
+
+
 def _validate_lang(code: str, option: str) -> None:
     """Valida que el código de idioma sea razonable."""
     code = code.strip()
@@ -292,6 +345,14 @@ def _validate_lang(code: str, option: str) -> None:
         _abort(f"{option}: código de idioma demasiado largo: '{code}'")
 
 
+def _normalize_lang(code: str) -> str:
+    """
+    Código en minúsculas e internado: viaja por todo el pipeline
+    (prompts, hashes, storage) y se compara muchas veces.
+    """
+    return sys.intern(code.lower())
+
+
 def _handle_already_done(book: str, action_label: str = "traducido") -> None:
     """
     El libro ya está completamente procesado.
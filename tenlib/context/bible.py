@@ -4,8 +4,21 @@ import re
 import unicodedata
 from dataclasses import dataclass, field
 from difflib import SequenceMatcher
+from functools import lru_cache
 from typing import Optional
 
+try:
+    # orjson (opcional) serializa la Bible en Rust; si no, json de la stdlib.
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # rapidfuzz (opcional) calcula la similitud en C; si no, difflib.
+    from rapidfuzz import fuzz, process
+except ImportError:
+    process = None
+
 
 @dataclass
 class BibleUpdate:
@@ -37,6 +50,13 @@ class BookBible:
     characters: dict[str, str] = field(default_factory=dict)
     last_scene: str            = "Inicio del libro — no hay contexto previo."
 
+    # Caché de character_name_index(): (nombres con que se calculó, índice).
+    # Se valida contra los nombres actuales, así que también detecta cambios
+    # hechos directamente sobre `characters` y no solo los de apply().
+    _character_index: Optional[tuple[tuple[str, ...], dict[str, str]]] = field(
+        default=None, init=False, repr=False, compare=False,
+    )
+
     # ------------------------------------------------------------------
     # Mutación
     # ------------------------------------------------------------------
@@ -56,19 +76,25 @@ class BookBible:
             self.characters.pop(name, None)
 
         # Nuevas entradas del glosario (no sobreescribir las existentes)
+        glossary_room = _MAX_GLOSSARY_ENTRIES - len(self.glossary)
         for term, translation in update.glossary.items():
-            if term not in self.glossary and len(self.glossary) < _MAX_GLOSSARY_ENTRIES:
+            if glossary_room <= 0:
+                break
+            if term not in self.glossary:
                 self.glossary[term] = translation
+                glossary_room -= 1
 
         # Personajes: agregar nuevos o actualizar si la descripción actual es genérica.
         # Permite que el AI extractor enriquezca entradas que el detector local
         # añadió con la descripción placeholder "personaje mencionado en esta escena".
+        character_room = _MAX_CHARACTER_ENTRIES - len(self.characters)
         for name, description in update.characters.items():
             if not _is_valid_character_name(name):
                 continue
             if name not in self.characters:
-                if len(self.characters) < _MAX_CHARACTER_ENTRIES:
+                if character_room > 0:
                     self.characters[name] = description
+                    character_room -= 1
             elif (
                 self.characters[name] == _GENERIC_CHARACTER_DESCRIPTION
                 and description != _GENERIC_CHARACTER_DESCRIPTION
@@ -92,6 +118,18 @@ class BookBible:
         if update.last_scene:
             self.last_scene = _truncate_text(update.last_scene, _MAX_LAST_SCENE_CHARS)
 
+    def character_name_index(self) -> dict[str, str]:
+        """
+        {nombre normalizado: nombre canónico} de los personajes, con la misma
+        normalización que el detector local. Se reutiliza en cada chunk
+        mientras el conjunto de nombres no cambie.
+        """
+        names = tuple(self.characters)
+        if self._character_index is None or self._character_index[0] != names:
+            index = {_normalize_token(name): name for name in names}
+            self._character_index = (names, index)
+        return self._character_index[1]
+
     def is_empty(self) -> bool:
         return (
             not self.glossary
@@ -103,18 +141,45 @@ class BookBible:
     # Serialización
     # ------------------------------------------------------------------
 
-    def to_json(self) -> str:
-        return json.dumps({
+    def to_json(self, pretty: bool = False) -> str:
+        """JSON compacto; `pretty=True` lo sangra para leerlo a mano."""
+        if orjson is not None:
+            try:
+                return orjson.dumps(self._as_dict(), option=_orjson_option(pretty)).decode()
+            except orjson.JSONEncodeError:
+                pass   # p. ej. surrogates sueltos: la stdlib sí los acepta
+        return _json_encoder(pretty).encode(self._as_dict())
+
+    def json_size(self, pretty: bool = False) -> int:
+        """Longitud de to_json() (sin materializar el string si no hay orjson)."""
+        if orjson is not None:
+            return len(self.to_json(pretty))
+        return sum(len(part) for part in _json_encoder(pretty).iterencode(self._as_dict()))
+
+    def to_blob(self) -> bytes:
+        """
+        to_json() en UTF-8 para guardar en SQLite, sin decode/encode
+        intermedio cuando hay orjson.
+        """
+        if orjson is not None:
+            try:
+                return orjson.dumps(self._as_dict())
+            except orjson.JSONEncodeError:
+                pass   # mismos casos que en to_json(): decide la stdlib
+        return self.to_json().encode("utf-8")
+
+    def _as_dict(self) -> dict:
+        return {
             "voice":      self.voice,
             "decisions":  self.decisions,
             "glossary":   self.glossary,
             "characters": self.characters,
             "last_scene": self.last_scene,
-        }, ensure_ascii=False, indent=2)
+        }
 
     @classmethod
-    def from_json(cls, raw: str) -> "BookBible":
-        data = json.loads(raw)
+    def from_json(cls, raw: str | bytes) -> "BookBible":
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
         return cls(
             voice      = data.get("voice", cls.voice),
             decisions  = data.get("decisions", []),
@@ -123,23 +188,41 @@ class BookBible:
             last_scene = data.get("last_scene", cls.last_scene),
         )
 
+    @classmethod
+    def from_blob(cls, raw: bytes | str) -> "BookBible":
+        """Acepta el BLOB de to_blob() y también filas antiguas en texto."""
+        return cls.from_json(raw)
+
     @classmethod
     def empty(cls) -> "BookBible":
         """Bible inicial para un libro nuevo."""
         return cls()
 
 
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_PRETTY_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, indent=2)
+
+
+def _json_encoder(pretty: bool) -> json.JSONEncoder:
+    return _PRETTY_JSON_ENCODER if pretty else _JSON_ENCODER
+
+
+def _orjson_option(pretty: bool) -> int:
+    return orjson.OPT_INDENT_2 if pretty else 0
+
+
 _MAX_GLOSSARY_ENTRIES = 600
 _MAX_CHARACTER_ENTRIES = 240
 _MAX_DECISIONS_ENTRIES = 18
 _MAX_LAST_SCENE_CHARS = 420
 _MAX_DECISION_CHARS = 220
+_DECISION_SIMILARITY = 0.84
 
 # Descripción que asigna el detector local cuando no tiene información real.
 # Si el AI extractor luego aporta una descripción concreta, se permite actualizar.
 _GENERIC_CHARACTER_DESCRIPTION = "personaje mencionado en esta escena"
 
-_NON_CHARACTER_SINGLE_WORDS = {
+_NON_CHARACTER_SINGLE_WORDS = frozenset({
     "el", "la", "los", "las",
     "un", "una", "unos", "unas",
     "yo", "tu", "tú", "mi", "mis", "me",
@@ -150,10 +233,18 @@ _NON_CHARACTER_SINGLE_WORDS = {
     "antes", "despues", "después",
     "estaba", "estaban", "era", "eran", "fue", "fueron", "es", "son",
     "texto", "original", "chunk", "capitulo", "capítulo",
-}
+})
+
 
+_NAME_CHARS_RE = re.compile(r"[A-Za-zÁÉÍÓÚÑáéíóúñ' -]+")
+_WS_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\wáéíóúñü ]+")
 
+
+@lru_cache(maxsize=8192)
 def _normalize_token(value: str) -> str:
+    if value.isascii():
+        return value.lower().strip()
     normalized = unicodedata.normalize("NFKD", value)
     normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
     return normalized.lower().strip()
@@ -164,10 +255,10 @@ def _is_valid_character_name(name: str) -> bool:
     if len(candidate) < 2 or len(candidate) > 80:
         return False
 
-    if not re.fullmatch(r"[A-Za-zÁÉÍÓÚÑáéíóúñ' -]+", candidate):
+    if not _NAME_CHARS_RE.fullmatch(candidate):
         return False
 
-    tokens = [t for t in re.split(r"\s+", candidate) if t]
+    tokens = [t for t in _WS_RE.split(candidate) if t]
     if not tokens:
         return False
 
@@ -195,10 +286,13 @@ def _clean_decision(decision: str) -> str:
     return _truncate_text(cleaned, _MAX_DECISION_CHARS)
 
 
+# Cacheada: cada apply() vuelve a comparar contra todas las decisiones
+# existentes, que son siempre las mismas cadenas de una llamada a otra.
+@lru_cache(maxsize=4096)
 def _normalize_decision(decision: str) -> str:
     text = (decision or "").strip().lower()
-    text = re.sub(r"\s+", " ", text)
-    text = re.sub(r"[^\wáéíóúñü ]+", "", text)
+    text = _WS_RE.sub(" ", text)
+    text = _PUNCT_RE.sub("", text)
     return text
 
 
@@ -207,10 +301,25 @@ def _is_new_decision(candidate: str, existing: list[str]) -> bool:
     if not normalized:
         return False
 
+    if process is not None:
+        return process.extractOne(
+            normalized,
+            [_normalize_decision(current) for current in existing],
+            scorer       = fuzz.ratio,
+            score_cutoff = _DECISION_SIMILARITY * 100,
+        ) is None
+
     for current in existing:
         curr_norm = _normalize_decision(current)
         if normalized == curr_norm:
             return False
-        if SequenceMatcher(None, normalized, curr_norm).ratio() >= 0.84:
+        # autojunk=False: con decisiones de ~200 caracteres la heurística de
+        # "basura" descarta letras frecuentes y distorsiona el ratio.
+        matcher = SequenceMatcher(None, normalized, curr_norm, autojunk=False)
+        if (
+            matcher.real_quick_ratio() >= _DECISION_SIMILARITY
+            and matcher.quick_ratio() >= _DECISION_SIMILARITY
+            and matcher.ratio() >= _DECISION_SIMILARITY
+        ):
             return False
     return True
@@ -1,51 +1,72 @@
+import heapq
 import re
 import unicodedata
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import chain
 from typing import Optional
 
 
+# Cacheada: el vocabulario de un chunk es pequeño y muy repetitivo
+# ("de", "dijo", los mismos nombres) y NFKD es caro en Python puro.
+@lru_cache(maxsize=8192)
 def _normalize_static(value: str) -> str:
-    text = unicodedata.normalize("NFKD", value or "")
+    if not value or value.isascii():
+        # ASCII ya está en NFKD y no tiene marcas combinantes.
+        return (value or "").lower().strip()
+    text = unicodedata.normalize("NFKD", value)
     text = "".join(ch for ch in text if not unicodedata.combining(ch))
     return text.lower().strip()
 
 
 _NAME_RE = re.compile(r"\b[A-ZÁÉÍÓÚÑ][a-záéíóúñ]{2,}\b")
 
-_SPEECH_VERBS = {
+_SPEECH_VERBS = frozenset({
     "dijo", "dijeron", "pregunto", "preguntó", "respondio", "respondió",
     "grito", "gritó", "susurro", "susurró", "murmuro", "murmuró",
     "exclamo", "exclamó", "anadio", "añadió",
-}
-_SPEECH_VERBS_NORMALIZED = {_normalize_static(v) for v in _SPEECH_VERBS}
-_ACTION_VERBS = {
+})
+_SPEECH_VERBS_NORMALIZED = frozenset(_normalize_static(v) for v in _SPEECH_VERBS)
+_ACTION_VERBS = frozenset({
     "miro", "miró", "sonrio", "sonrió", "asintio", "asintió",
     "avanzo", "avanzó", "ataco", "atacó", "corrio", "corrió",
-    "rio", "rió", "sonrio", "sonrió", "penso", "pensó",
+    "rio", "rió", "penso", "pensó",
     "ordeno", "ordenó", "entro", "entró", "salio", "salió",
-}
-_ACTION_VERBS_NORMALIZED = {_normalize_static(v) for v in _ACTION_VERBS}
-_TITLE_HINTS = {
+})
+_ACTION_VERBS_NORMALIZED = frozenset(_normalize_static(v) for v in _ACTION_VERBS)
+_TITLE_HINTS = frozenset({
     "señor", "señora", "sr", "sra", "sir", "lady", "lord",
     "rey", "reina", "príncipe", "principe", "princesa",
     "general", "capitán", "capitan", "doctor", "doctora",
-}
-_TITLE_HINTS_NORMALIZED = {
+})
+_TITLE_HINTS_NORMALIZED = frozenset(
     _normalize_static(value)
     for value in _TITLE_HINTS
-}
+)
+
+# Patrones compilados una sola vez a partir de los conjuntos de verbos.
+_SPEECH_ALTERNATION = "|".join(re.escape(v) for v in _SPEECH_VERBS)
+_SPEECH_RE = re.compile(rf"\b(?:{_SPEECH_ALTERNATION})\b", re.IGNORECASE)
+_SPEECH_PREFIX_RE = re.compile(rf"(?:{_SPEECH_ALTERNATION})\b", re.IGNORECASE)
+_SPEECH_AFTER_RE = re.compile(rf"\s+(?:{_SPEECH_ALTERNATION})\b", re.IGNORECASE)
+_ACTION_AFTER_RE = re.compile(
+    rf"\s+(?:{'|'.join(re.escape(v) for v in _ACTION_VERBS)})\b",
+    re.IGNORECASE,
+)
+_LETTERS_RE = re.compile(r"[A-Za-zÁÉÍÓÚÑáéíóúñ]+")
 
 # Preposiciones genitivas: "de/del" antes de un nombre → señal de lugar u organización.
 # "de Tempest", "del Reino" = lugar/org. Diferente de "a Diego" (personal a = personaje).
-_GENITIVE_PREPOSITIONS = {"de", "del"}
+_GENITIVE_PREPOSITIONS = frozenset({"de", "del"})
 
-_NON_CHARACTER_WORDS = {
+_NON_CHARACTER_WORDS = frozenset(
     _normalize_static(word)
-    for word in {
+    for word in (
     # Pronombres y artículos
     "el", "la", "los", "las", "un", "una",
     "de", "del", "al", "en", "por", "para", "con", "sin",
-    "el", "él", "ella", "ellas", "ello", "ellos",
+    "él", "ella", "ellas", "ello", "ellos",
     "eso", "esto", "esta", "este", "antes", "despues", "después",
     "cuando", "mientras", "aunque", "porque", "pero", "como", "qué", "que",
     "entonces", "asi", "así", "todavia", "todavía", "bueno",
@@ -69,7 +90,7 @@ _NON_CHARACTER_WORDS = {
     # Marcadores de página/sección frecuentes en light novels escaneadas
     "pagina", "página", "regreso", "estrella",
     # Tipos y razas que no son nombres propios individuales
-    "dragon", "slime", "demon", "angel",
+    "dragon", "slime", "demon",
     # Títulos en inglés que no son nombres propios
     "lord", "king", "queen", "emperor", "master",
     # Palabras comunes del inglés que aparecen en textos originales sin traducir
@@ -81,9 +102,9 @@ _NON_CHARACTER_WORDS = {
     "being", "said", "still", "again", "most", "other", "into", "over",
     "after", "before", "about", "just", "your", "our", "and", "but", "not",
     "any", "new", "see", "its", "for", "are",
-    "reincarnated", "slime",
-    }
-}
+    "reincarnated",
+    )
+)
 
 
 @dataclass
@@ -97,11 +118,23 @@ class _CandidateStats:
     first_index: int = field(default_factory=lambda: 10**9)
 
 
+@dataclass
+class CharacterCandidates:
+    """
+    Evidencia cruda de nombres capitalizados en un texto, sin contexto de Bible.
+    Es la parte cara de la detección y no depende de personajes ya conocidos,
+    así que puede calcularse en paralelo y rankearse después.
+    """
+    stats_by_norm:   dict[str, _CandidateStats] = field(default_factory=dict)
+    display_by_norm: dict[str, str]             = field(default_factory=dict)
+
+
 def extract_character_mentions(
     source_text: str,
     translated_text: str,
     max_characters: int = 6,
     existing_characters: Optional[dict[str, str]] = None,
+    existing_characters_index: Optional[dict[str, str]] = None,
 ) -> dict[str, str]:
     """
     Detecta personajes con evidencia contextual para evitar ruido:
@@ -112,17 +145,32 @@ def extract_character_mentions(
     - Genitivo puro: nombre que aparece SOLO después de "de/del" sin ningún
       contexto directo de personaje → probable lugar u organización.
     """
+    candidates = collect_character_candidates(source_text, translated_text)
+    return rank_character_candidates(
+        candidates, max_characters, existing_characters, existing_characters_index,
+    )
+
+
+def collect_character_candidates(source_text: str, translated_text: str) -> CharacterCandidates:
+    """Recorre el texto una vez y acumula la evidencia de cada nombre candidato."""
+    candidates = CharacterCandidates()
     combined = f"{source_text or ''}\n{translated_text or ''}".strip()
     if not combined:
-        return {}
+        return candidates
 
-    known = existing_characters or {}
-    known_by_norm = {_normalize(name): name for name in known}
+    # Sin ningún nombre capitalizado (diálogo en minúsculas, chunks cortos)
+    # no vale la pena indexar palabras ni verbos.
+    matches = _NAME_RE.finditer(combined)
+    first = next(matches, None)
+    if first is None:
+        return candidates
 
-    stats_by_norm: dict[str, _CandidateStats] = {}
-    display_by_norm: dict[str, str] = {}
+    stats_by_norm = candidates.stats_by_norm
+    display_by_norm = candidates.display_by_norm
+    words = _WordIndex(combined)
+    speech = _SpeechIndex(combined)
 
-    for match in _NAME_RE.finditer(combined):
+    for match in chain((first,), matches):
         raw_name = match.group(0)
         norm = _normalize(raw_name)
 
@@ -132,30 +180,57 @@ def extract_character_mentions(
 
         if _is_sentence_start(combined, match.start()):
             stats.sentence_start_hits += 1
-        if _has_speech_context(combined, raw_name, match.start(), match.end()):
+        if (
+            _SPEECH_AFTER_RE.match(combined, match.end(), match.end() + 42)
+            or speech.precedes(raw_name, match.start())
+        ):
             stats.speech_hits += 1
-        if _has_action_context(combined, raw_name, match.start(), match.end()):
+        if _ACTION_AFTER_RE.match(combined, match.end(), match.end() + 24):
             stats.action_hits += 1
-        if _has_title_context(combined, match.start()):
+        if words.previous(match.start(), 20) in _TITLE_HINTS_NORMALIZED:
             stats.title_hits += 1
-        if _has_genitive_context(combined, match.start()):
+        if words.previous(match.start(), 25) in _GENITIVE_PREPOSITIONS:
             stats.genitive_hits += 1
 
-        # Conserva variante canónica del nombre.
-        if norm in known_by_norm:
-            display_by_norm[norm] = known_by_norm[norm]
-        else:
-            display_by_norm.setdefault(norm, raw_name)
+        display_by_norm.setdefault(norm, raw_name)
+
+    return candidates
 
-    ranked: list[tuple[int, int, int, str]] = []
-    for norm, stats in stats_by_norm.items():
-        display = display_by_norm[norm]
 
+def rank_character_candidates(
+    candidates: CharacterCandidates,
+    max_characters: int = 6,
+    existing_characters: Optional[dict[str, str]] = None,
+    existing_characters_index: Optional[dict[str, str]] = None,
+) -> dict[str, str]:
+    """
+    Filtra y ordena los candidatos usando los personajes ya conocidos:
+    los conocidos conservan su variante canónica y siempre puntúan alto.
+
+    existing_characters_index: {normalizado: canónico} ya calculado
+    (BookBible.character_name_index()); evita renormalizar el elenco
+    en cada chunk. Si se pasa, tiene prioridad sobre existing_characters.
+    """
+    if existing_characters_index is not None:
+        known_by_norm = existing_characters_index
+    else:
+        known = existing_characters or {}
+        known_by_norm = {_normalize(name): name for name in known}
+
+    # Claves puramente enteras: el nombre a mostrar va aparte, indexado por
+    # la posición en `displays`, para que el heap nunca compare strings.
+    ranked: list[tuple[int, int, int, int]] = []
+    displays: list[str] = []
+    for norm, stats in candidates.stats_by_norm.items():
         if norm in known_by_norm:
+            # Conserva variante canónica del nombre.
             score = 100 + stats.occurrences
-            ranked.append((score, stats.occurrences, -stats.first_index, display))
+            ranked.append((score, stats.occurrences, -stats.first_index, len(displays)))
+            displays.append(known_by_norm[norm])
             continue
 
+        display = candidates.display_by_norm[norm]
+
         if norm in _NON_CHARACTER_WORDS:
             continue
         if norm in _SPEECH_VERBS_NORMALIZED or norm in _ACTION_VERBS_NORMALIZED:
@@ -179,12 +254,14 @@ def extract_character_mentions(
         )
 
         if score >= 2 and (has_direct_context or repeated_with_body_context):
-            ranked.append((score, stats.occurrences, -stats.first_index, display))
-
-    ranked.sort(reverse=True)
+            ranked.append((score, stats.occurrences, -stats.first_index, len(displays)))
+            displays.append(display)
 
+    # Solo interesan los primeros max_characters: heap parcial en vez de
+    # ordenar todo el elenco (nlargest equivale a sorted(reverse=True)[:n]).
     selected: dict[str, str] = {}
-    for _, _, _, name in ranked:
+    for _, _, _, index in heapq.nlargest(max(max_characters, 1), ranked):
+        name = displays[index]
         if name not in selected:
             selected[name] = "personaje mencionado en esta escena"
         if len(selected) >= max_characters:
@@ -215,40 +292,86 @@ def _is_sentence_start(text: str, index: int) -> bool:
     return i < 0 or text[i] in ".!?\n"
 
 
-def _has_speech_context(text: str, name: str, start: int, end: int) -> bool:
-    before = text[max(0, start - 42):start]
-    after = text[end:end + 42]
-    speech_re = "|".join(re.escape(v) for v in _SPEECH_VERBS)
-    return bool(
-        re.search(rf"\b(?:{speech_re})\s+{re.escape(name)}\b", before, flags=re.IGNORECASE)
-        or re.search(rf"^\s+(?:{speech_re})\b", after, flags=re.IGNORECASE)
-    )
+class _SpeechIndex:
+    """
+    Posiciones de todos los verbos de habla del texto, buscados una sola vez.
+    Para "dijo Kvothe" basta mirar, con bisect, los verbos de la ventana
+    previa al nombre en vez de lanzar un regex por mención.
 
+    Reproduce la ventana de 42 caracteres de antes: un verbo cortado por el
+    borde izquierdo ("contra|dijo") también cuenta, como ocurría al buscar
+    sobre el slice.
+    """
 
-def _has_action_context(text: str, name: str, start: int, end: int) -> bool:
-    after = text[end:end + 24]
-    action_re = "|".join(re.escape(v) for v in _ACTION_VERBS)
-    return bool(re.search(rf"^\s+(?:{action_re})\b", after, flags=re.IGNORECASE))
+    _WINDOW = 42
+
+    def __init__(self, text: str):
+        self._text = text
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        for match in _SPEECH_RE.finditer(text):
+            self._starts.append(match.start())
+            self._ends.append(match.end())
+
+    def precedes(self, name: str, start: int) -> bool:
+        """¿Hay un "verbo Nombre" completo dentro de la ventana previa a `start`?"""
+        floor = max(0, start - self._WINDOW)
+        edge = _SPEECH_PREFIX_RE.match(self._text, floor, start)
+        if edge and self._name_follows(edge.end(), name, start):
+            return True
+
+        k = bisect_left(self._starts, floor)
+        while k < len(self._starts) and self._ends[k] < start:
+            if self._name_follows(self._ends[k], name, start):
+                return True
+            k += 1
+        return False
 
+    def _name_follows(self, index: int, name: str, limit: int) -> bool:
+        """Espacios desde `index` y luego `name` como palabra, sin pasar `limit`."""
+        text = self._text
+        j = index
+        while j < limit and text[j].isspace():
+            j += 1
+        name_end = j + len(name)
+        return (
+            j > index
+            and name_end <= limit
+            and text[j:name_end].lower() == name.lower()
+            and (name_end == limit or not _is_word_char(text[name_end]))
+        )
 
-def _has_title_context(text: str, start: int) -> bool:
-    before = text[max(0, start - 20):start]
-    tokens = re.findall(r"[A-Za-zÁÉÍÓÚÑáéíóúñ]+", before)
-    if not tokens:
-        return False
-    return _normalize(tokens[-1]) in _TITLE_HINTS_NORMALIZED
 
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
 
-def _has_genitive_context(text: str, start: int) -> bool:
+
+class _WordIndex:
     """
-    Detecta si el nombre aparece inmediatamente después de una preposición
-    genitiva ("de" / "del"). Esta combinación es señal de lugar u organización
-    ("ejecutivos de Tempest", "rey del Norte") más que de personaje individual.
+    Tokeniza el texto una sola vez (rachas de letras) para que cada nombre
+    consulte su palabra anterior con una búsqueda binaria, sin volver a
+    recorrer ventanas del texto con regex.
 
-    Se busca hacia atrás ignorando espacios para encontrar el último token.
+    Las ventanas se respetan igual que antes: si la palabra anterior empieza
+    antes del límite, se recorta (como hacía findall sobre el slice).
     """
-    before = text[max(0, start - 25):start]
-    tokens = re.findall(r"[A-Za-záéíóúñÁÉÍÓÚÑ]+", before)
-    if not tokens:
-        return False
-    return _normalize(tokens[-1]) in _GENITIVE_PREPOSITIONS
+
+    def __init__(self, text: str):
+        self._text = text
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        for match in _LETTERS_RE.finditer(text):
+            self._starts.append(match.start())
+            self._ends.append(match.end())
+
+    def previous(self, index: int, window: int) -> str:
+        """
+        Última palabra (normalizada) dentro de los `window` caracteres
+        anteriores a `index`; "" si no hay ninguna. Título ("señor") y
+        genitivo ("de/del") se vuelven una búsqueda en conjunto.
+        """
+        k = bisect_right(self._ends, index) - 1
+        floor = max(0, index - window)
+        if k < 0 or self._ends[k] <= floor:
+            return ""
+        return _normalize(self._text[max(self._starts[k], floor):self._ends[k]])
@@ -1,6 +1,14 @@
 # context/compressor.py
+from typing import Optional
+
 from tenlib.context.bible import BookBible
 
+try:
+    # pyahocorasick (opcional): un solo recorrido del chunk para todos los términos.
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 _MAX_DECISIONS_IN_PROMPT = 8
 _MAX_LAST_SCENE_IN_PROMPT = 320
 
@@ -13,6 +21,14 @@ class BibleCompressor:
     No modifica la Bible original — siempre devuelve una nueva instancia.
     """
 
+    def __init__(self):
+        # Índices de la última Bible vista (claves en minúsculas y autómata):
+        # se reconstruyen solo si cambian los términos del glosario o los
+        # nombres de personajes, no en cada chunk.
+        self._keys: Optional[tuple[tuple[str, ...], tuple[str, ...]]] = None
+        self._lowered: tuple[list[str], list[str]] = ([], [])
+        self._automaton = None
+
     def compress(self, bible: BookBible, chunk_text: str) -> BookBible:
         """
         Filtra glosario y personajes a los que aparecen en el chunk.
@@ -29,18 +45,26 @@ class BibleCompressor:
                 last_scene = _truncate_scene(bible.last_scene),
             )
 
+        glossary_lower, characters_lower = self._index(bible)
         chunk_lower = chunk_text.lower()
 
+        if self._automaton is not None:
+            # "" siempre está contenido, igual que `"" in chunk_lower`.
+            found = {"", *(term for _, term in self._automaton.iter(chunk_lower))}
+            appears = found.__contains__
+        else:
+            appears = chunk_lower.__contains__
+
         relevant_glossary = {
             term: translation
-            for term, translation in bible.glossary.items()
-            if term.lower() in chunk_lower
+            for (term, translation), lowered in zip(bible.glossary.items(), glossary_lower)
+            if appears(lowered)
         }
 
         relevant_characters = {
             name: description
-            for name, description in bible.characters.items()
-            if name.lower() in chunk_lower
+            for (name, description), lowered in zip(bible.characters.items(), characters_lower)
+            if appears(lowered)
         }
 
         return BookBible(
@@ -51,6 +75,29 @@ class BibleCompressor:
             last_scene = _truncate_scene(bible.last_scene),
         )
 
+    def _index(self, bible: BookBible) -> tuple[list[str], list[str]]:
+        """
+        Claves del glosario y de personajes en minúsculas, en el mismo orden
+        que los dicts. Con pyahocorasick además prepara el autómata.
+        """
+        keys = (tuple(bible.glossary), tuple(bible.characters))
+        if keys == self._keys:
+            return self._lowered
+
+        self._keys = keys
+        self._lowered = ([t.lower() for t in keys[0]], [n.lower() for n in keys[1]])
+        self._automaton = None
+
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for lowered in (*self._lowered[0], *self._lowered[1]):
+                if lowered:
+                    automaton.add_word(lowered, lowered)
+            if len(automaton):
+                automaton.make_automaton()
+                self._automaton = automaton
+        return self._lowered
+
     def compression_ratio(self, original: BookBible, compressed: BookBible) -> float:
         """
         Métrica de cuánto se redujo la Bible.
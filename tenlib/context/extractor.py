@@ -1,9 +1,20 @@
 # context/extractor.py
+import hashlib
 import json
 import logging
 import re
+import string
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict
 from typing import Optional, Protocol
 
+try:
+    # orjson (opcional) decodifica la respuesta del modelo en Rust.
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
 from tenlib.context.bible import BibleUpdate
 
 logger = logging.getLogger(__name__)
@@ -11,20 +22,28 @@ logger = logging.getLogger(__name__)
 # Cada cuántos chunks se extrae aunque el modelo no reporte nada nuevo
 _EXTRACT_EVERY_N = 5
 
-_EXTRACTION_PROMPT = """\
+# Respuestas recordadas en memoria (además de la caché persistente, si hay).
+# Subir _EXTRACTOR_VERSION invalida todo lo cacheado si cambia el parseo.
+_CACHE_MAX_ENTRIES = 256
+_EXTRACTOR_VERSION = "1"
+
+# Instrucciones fijas: van como system prompt y son idénticas en todas las
+# llamadas. Todo lo que cambia por chunk va después, en el mensaje
+# (_EXTRACTION_INPUT). No se marcan para prompt caching: son más cortas que
+# el prefijo mínimo cacheable del proveedor y el marcador nunca acertaría.
+_EXTRACTION_SYSTEM = """\
 Analiza el fragmento original y su traducción. Extrae únicamente información nueva \
 que deba recordarse para mantener consistencia en el resto del libro.
 
-FRAGMENTO ORIGINAL:
-{original}
-
-TRADUCCIÓN:
-{translation}
-
-NOTAS DEL TRADUCTOR:
-{notes}
+Si el mensaje incluye CANDIDATOS DE PERSONAJES DETECTADOS AUTOMÁTICAMENTE, \
+para la sección "characters" revisa cada candidato de esa lista:
+- Si es un individuo real (personaje que actúa, habla o tiene relevancia narrativa): \
+inclúyelo con el formato "Género: M/F/N | Rol: ... | Habla: ... | Personalidad: ..."
+- Si es un lugar, organización, grupo, título colectivo, palabra común del inglés \
+(That, The, Time, Got, Dragon, Lord...) o sustantivo común del español (Página, Regreso, \
+Estrella...): NO lo incluyas en "characters". Ponlo en "rejected".
+Además, añade cualquier personaje nuevo que encuentres en el fragmento y no esté listado.
 
-{candidates_section}\
 Extrae:
 0. Voz narrativa: persona gramatical (primera/tercera), tiempo verbal (pasado/presente) \
 y rasgo principal del narrador (ej. "íntima y reflexiva", "épica y descriptiva", \
@@ -34,8 +53,8 @@ tono íntimo y contemplativo".
 especiales, títulos únicos y nombres de lugares que aparecen en este fragmento. \
 Incluye TODO término relevante con su traducción establecida, incluso los que se decidió \
 mantener sin traducir (ej. "Void" → "Void"). \
-Ejemplo: {{"Pseudo-Dragon Body": "[Cuerpo de Pseudo-Dragón]", "Void": "Void", \
-"Heart Core": "[Núcleo del Corazón]", "Eternal Twilight": "Eternal Twilight"}}.
+Ejemplo: {"Pseudo-Dragon Body": "[Cuerpo de Pseudo-Dragón]", "Void": "Void", \
+"Heart Core": "[Núcleo del Corazón]", "Eternal Twilight": "Eternal Twilight"}.
 2. Personajes: solo individuos con nombre propio (personas, criaturas, entidades únicas) \
 que actúan, hablan o tienen relevancia narrativa. \
 NO incluyas lugares, reinos, organizaciones, grupos ni títulos colectivos. \
@@ -49,39 +68,56 @@ clara. Ejemplo válido: "usar tuteo consistente en diálogos entre protagonistas
 4. Resumen en 2 frases de qué ocurrió en esta escena (para continuidad).
 
 Responde ÚNICAMENTE con JSON válido:
-{{
+{
   "voice": "persona, tiempo verbal y rasgo principal del narrador",
-  "glossary": {{"término_original": "término_traducido"}},
-  "characters": {{"nombre": "Género: M/F/N | Rol: ... | Habla: ... | Personalidad: ..."}},
+  "glossary": {"término_original": "término_traducido"},
+  "characters": {"nombre": "Género: M/F/N | Rol: ... | Habla: ... | Personalidad: ..."},
   "rejected": ["nombre_que_no_es_personaje"],
   "decisions": ["decisión concreta que debe mantenerse"],
   "last_scene": "resumen de 2 frases de la escena"
-}}
+}
 
 Si no hay nada nuevo en alguna categoría, devuelve un objeto/lista vacío.
 No inventes términos que no aparezcan en el fragmento.
 """
 
-# Sección de candidatos que se inyecta cuando el detector local aportó nombres.
-# La IA valida cuáles son personajes reales y enriquece sus descripciones.
-_CANDIDATES_SECTION = """\
+_EXTRACTION_INPUT = """\
+FRAGMENTO ORIGINAL:
+{original}
+
+TRADUCCIÓN:
+{translation}
+
+NOTAS DEL TRADUCTOR:
+{notes}
+{candidates_section}"""
+
+# Lista de candidatos que se añade cuando el detector local aportó nombres.
+# La IA valida cuáles son personajes reales y enriquece sus descripciones
+# (las reglas para hacerlo están en _EXTRACTION_SYSTEM).
+_CANDIDATES_SECTION = """
 CANDIDATOS DE PERSONAJES DETECTADOS AUTOMÁTICAMENTE:
 {candidates_list}
+"""
 
-Para la sección "characters": revisa cada candidato de la lista anterior.
-- Si es un individuo real (personaje que actúa, habla o tiene relevancia narrativa): \
-inclúyelo con el formato "Género: M/F/N | Rol: ... | Habla: ... | Personalidad: ..."
-- Si es un lugar, organización, grupo, título colectivo, palabra común del inglés \
-(That, The, Time, Got, Dragon, Lord...) o sustantivo común del español (Página, Regreso, \
-Estrella...): NO lo incluyas en "characters". Ponlo en "rejected".
-Además, añade cualquier personaje nuevo que encuentres en el fragmento y no esté listado.
+# Las plantillas se parten una vez en sus tramos literales: armar el prompt
+# es un "".join de tramos y valores, sin que str.format reparsee cada vez.
+_INPUT_P0, _INPUT_P1, _INPUT_P2, _INPUT_P3 = (
+    literal for literal, _, _, _ in string.Formatter().parse(_EXTRACTION_INPUT)
+)
+_CANDIDATES_P0, _CANDIDATES_P1 = (
+    literal for literal, _, _, _ in string.Formatter().parse(_CANDIDATES_SECTION)
+)
 
-"""
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_JSON_TOKEN_RE  = re.compile(r'[{}"\\]')
 
-# Captura JSON en bloque markdown. Usa {.*} greedy para soportar JSON anidado.
-# (glossary y characters son dicts → el non-greedy {.*?} rompía con ellos)
-_MARKDOWN_JSON_RE = re.compile(r"```(?:json)?\s*(\{.*\})\s*```", re.DOTALL)
-_BARE_JSON_RE     = re.compile(r"\{.*\}", re.DOTALL)
+# Palabras en las notas del traductor que indican que hay algo que extraer.
+# Una sola pasada en C, sin notes.lower() por chunk.
+_NOTES_KEYWORDS_RE = re.compile(
+    "nuevo|new|término|term|personaje|character|nombre|name|decisión|decision",
+    re.IGNORECASE,
+)
 
 
 class TranslationModel(Protocol):
@@ -89,7 +125,20 @@ class TranslationModel(Protocol):
     Interfaz mínima que el Extractor necesita del modelo.
     Desacoplado del Router — solo necesita poder hacer una llamada.
     """
-    def translate(self, chunk: str, system_prompt: str): ...
+    def translate(self, chunk: str, system_prompt: str):
+        ...
+
+
+class ExtractCacheStore(Protocol):
+    """
+    Almacén persistente de respuestas del extractor (lo implementa
+    Repository). Evita repetir llamadas al reanudar o re-ejecutar un libro.
+    """
+    def get_extract_cache(self, key: str) -> Optional[str]:
+        ...
+
+    def save_extract_cache(self, key: str, update_json: str) -> None:
+        ...
 
 
 class BibleExtractor:
@@ -105,9 +154,16 @@ class BibleExtractor:
     La decisión de aplicar el update la toma el Orchestrator.
     """
 
-    def __init__(self, model: TranslationModel, extract_every_n: int = _EXTRACT_EVERY_N):
+    def __init__(
+        self,
+        model:           TranslationModel,
+        extract_every_n: int                           = _EXTRACT_EVERY_N,
+        cache_store:     Optional[ExtractCacheStore]  = None,
+    ):
         self._model           = model
         self._extract_every_n = extract_every_n
+        self._cache_store     = cache_store
+        self._cache: OrderedDict[str, str] = OrderedDict()
         self._chunks_since_last_extract = 0
 
     def should_extract(self, chunk_index: int, notes: str, force: bool = False) -> bool:
@@ -125,16 +181,7 @@ class BibleExtractor:
         if force:
             return True
 
-        notes_lower = notes.lower()
-        model_found_something = any(
-            keyword in notes_lower
-            for keyword in [
-                "nuevo", "new", "término", "term",
-                "personaje", "character", "nombre", "name",
-                "decisión", "decision",
-            ]
-        )
-        if model_found_something:
+        if _NOTES_KEYWORDS_RE.search(notes):
             return True
 
         self._chunks_since_last_extract += 1
@@ -168,20 +215,27 @@ class BibleExtractor:
         if not self.should_extract(chunk_index, notes, force=force):
             return None
 
-        candidates_section = _build_candidates_section(character_candidates)
+        prompt = _build_input(original, translation, notes, character_candidates)
 
-        prompt = _EXTRACTION_PROMPT.format(
-            original           = original,
-            translation        = translation,
-            notes              = notes or "Sin notas.",
-            candidates_section = candidates_section,
-        )
+        cache_key = _cache_key(prompt)
+        cached    = self._cache_get(cache_key)
+        if cached is not None:
+            self._chunks_since_last_extract = 0
+            return cached
 
         try:
-            response = self._model.translate(prompt, system_prompt="")
+            response = self._model.translate(
+                prompt,
+                system_prompt = _EXTRACTION_SYSTEM,
+            )
             raw_text = response.translation  # el extractor reutiliza ModelResponse
             self._chunks_since_last_extract = 0
-            return self._parse_update(raw_text)
+            update = self._parse_update(raw_text)
+            if update != BibleUpdate():
+                # Las respuestas vacías o no parseables no se cachean:
+                # un reintento puede salir mejor.
+                self._cache_put(cache_key, update)
+            return update
 
         except Exception as e:
             logger.warning(
@@ -190,6 +244,35 @@ class BibleExtractor:
             )
             return None
 
+    def _cache_get(self, key: str) -> Optional[BibleUpdate]:
+        raw = self._cache.get(key)
+        if raw is not None:
+            self._cache.move_to_end(key)
+        elif self._cache_store is not None:
+            try:
+                raw = self._cache_store.get_extract_cache(key)
+            except Exception as e:
+                logger.warning("Extractor: no se pudo leer la caché: %s", e)
+            if raw is not None:
+                self._remember(key, raw)
+        # Siempre una instancia nueva: el Orchestrator puede mutar el update.
+        return BibleUpdate(**_json_loads(raw)) if raw is not None else None
+
+    def _cache_put(self, key: str, update: BibleUpdate) -> None:
+        raw = json.dumps(asdict(update), ensure_ascii=False)
+        self._remember(key, raw)
+        if self._cache_store is not None:
+            try:
+                self._cache_store.save_extract_cache(key, raw)
+            except Exception as e:
+                logger.warning("Extractor: no se pudo guardar en caché: %s", e)
+
+    def _remember(self, key: str, raw: str) -> None:
+        self._cache[key] = raw
+        self._cache.move_to_end(key)
+        if len(self._cache) > _CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+
     def _parse_update(self, raw_text: str) -> BibleUpdate:
         """
         Parsea la respuesta del modelo con la misma estrategia de degradación
@@ -212,49 +295,138 @@ class BibleExtractor:
 
     @staticmethod
     def _try_parse_json(text: str) -> Optional[dict]:
-        # Intento 1: JSON directo
-        try:
-            result = json.loads(text)
-            if isinstance(result, dict):
+        # Intento 1: JSON directo (un objeto solo puede empezar por "{")
+        if text.startswith("{"):
+            result = _loads_dict(text)
+            if result is not None:
                 return result
-        except (json.JSONDecodeError, ValueError):
-            pass
 
-        # Intento 2: dentro de bloque markdown
-        match = _MARKDOWN_JSON_RE.search(text)
-        if match:
-            try:
-                result = json.loads(match.group(1))
-                if isinstance(result, dict):
+        # Intento 2: dentro de bloque markdown; intento 3: en todo el texto.
+        # Se recorre el texto una vez buscando el primer objeto balanceado
+        # (glossary y characters son dicts anidados, así que no basta con
+        # cortar en la primera "}").
+        fence   = text.find("```")
+        origins = (fence, 0) if fence > 0 else (0,)
+        for origin in origins:
+            span = BibleExtractor._find_json_span(text, origin)
+            if span is None:
+                continue
+            start, end = span
+            result = _loads_dict(text[start:end])
+            if result is not None:
+                return result
+            # Compatibilidad con el comportamiento anterior: de la primera
+            # "{" a la última "}" (cubre llaves sueltas dentro del texto).
+            last = text.rfind("}") + 1
+            if last > end:
+                result = _loads_dict(text[start:last])
+                if result is not None:
                     return result
-            except (json.JSONDecodeError, ValueError):
-                pass
 
-        # Intento 3: primer objeto JSON en el texto
-        match = _BARE_JSON_RE.search(text)
-        if match:
-            try:
-                result = json.loads(match.group(0))
-                if isinstance(result, dict):
-                    return result
-            except (json.JSONDecodeError, ValueError):
-                pass
+        return None
 
+    @staticmethod
+    def _find_json_span(text: str, start: int = 0) -> Optional[tuple[int, int]]:
+        """
+        Devuelve (inicio, fin) del primer objeto {...} balanceado a partir
+        de `start`, ignorando llaves dentro de strings. None si no hay.
+        """
+        begin = text.find("{", start)
+        if begin == -1:
+            return None
+
+        depth     = 0
+        in_string = False
+        skip      = -1
+        # Solo se visitan los caracteres relevantes; el resto lo salta re en C.
+        for match in _JSON_TOKEN_RE.finditer(text, begin):
+            pos = match.start()
+            if pos == skip:
+                continue
+            char = match.group()
+            if char == "\\":
+                if in_string:
+                    skip = pos + 1
+            elif char == '"':
+                in_string = not in_string
+            elif in_string:
+                continue
+            elif char == "{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return begin, pos + 1
         return None
 
     @staticmethod
     def _safe_dict(value) -> dict[str, str]:
         if not isinstance(value, dict):
             return {}
+        # Caso habitual: el modelo respetó el esquema y el dict recién
+        # decodificado ya está limpio; se devuelve tal cual sin copiarlo.
+        if all(type(k) is str and k and type(v) is str and v for k, v in value.items()):
+            return value
         return {str(k): str(v) for k, v in value.items() if k and v}
 
     @staticmethod
     def _safe_list(value) -> list[str]:
         if not isinstance(value, list):
             return []
+        if all(type(item) is str and item for item in value):
+            return value
         return [str(item) for item in value if item]
 
 
+def _loads_dict(text: str) -> Optional[dict]:
+    try:
+        # orjson.JSONDecodeError hereda de json.JSONDecodeError.
+        result = _json_loads(text)
+    except (json.JSONDecodeError, ValueError):
+        return None
+    return result if isinstance(result, dict) else None
+
+
+def _cache_key(prompt: str) -> str:
+    """
+    Clave de caché: el prompt completo (ya canonicalizado, con candidatos)
+    más las instrucciones fijas y la versión del extractor.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (_EXTRACTOR_VERSION, _EXTRACTION_SYSTEM, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _canonicalize(text: Optional[str]) -> str:
+    """
+    Misma entrada semántica → mismos bytes en el prompt: NFC, saltos de
+    línea Unix, sin espacios al final de línea ni más de una línea en blanco.
+    Evita fallos de caché del proveedor por diferencias invisibles.
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n").replace("\r", "\n")
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip("\n")
+
+
+def _build_input(
+    original:             str,
+    translation:          str,
+    notes:                str,
+    character_candidates: Optional[dict[str, str]],
+) -> str:
+    """Mensaje variable de una extracción (lo que va tras el system prompt)."""
+    return "".join((
+        _INPUT_P0, _canonicalize(original),
+        _INPUT_P1, _canonicalize(translation),
+        _INPUT_P2, _canonicalize(notes) or "Sin notas.",
+        _INPUT_P3, _build_candidates_section(character_candidates),
+    ))
+
+
 def _build_candidates_section(candidates: Optional[dict[str, str]]) -> str:
     """
     Construye la sección de candidatos para el prompt de extracción.
@@ -262,5 +434,7 @@ def _build_candidates_section(candidates: Optional[dict[str, str]]) -> str:
     """
     if not candidates:
         return ""
-    candidates_list = "\n".join(f"  - {name}" for name in candidates)
-    return _CANDIDATES_SECTION.format(candidates_list=candidates_list)
+    # Orden fijo: el mismo conjunto de candidatos produce siempre los mismos
+    # bytes (y la misma clave de caché), venga en el orden que venga.
+    candidates_list = "\n".join(["  - " + name for name in sorted(candidates)])
+    return "".join((_CANDIDATES_P0, candidates_list, _CANDIDATES_P1))
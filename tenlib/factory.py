@@ -24,19 +24,23 @@ _CHUNK_PRESETS: dict[str, dict] = {
 
 
 def build_orchestrator(
-    db_path:     Optional[str]  = None,
-    config_path: Optional[str]  = None,
-    output_dir:  Optional[Path] = None,
-    chunk_size:  str            = "standard",
+    db_path:       Optional[str]  = None,
+    config_path:   Optional[str]  = None,
+    output_dir:    Optional[Path] = None,
+    chunk_size:    str            = "standard",
+    max_in_flight: int            = 1,
 ) -> Orchestrator:
     """
     Ensambla el Orchestrator con todas sus dependencias.
     Punto de entrada único para el CLI y los tests de integración.
 
     chunk_size: "standard" | "large" | "xlarge" — controla el tamaño de los chunks.
+    max_in_flight: chunks traducidos en paralelo (1 = secuencial, máxima coherencia).
     El output siempre es TXT, independientemente del formato de entrada.
     """
-    repo   = Repository(db_path=db_path)
+    # Con varias traducciones en vuelo los adaptadores registran quota desde
+    # los hilos del pool: solo entonces hace falta compartir la conexión.
+    repo   = Repository(db_path=db_path, threaded=max_in_flight > 1)
     models = _build_models(repo, config_path)
     router = Router(models)
 
@@ -50,8 +54,9 @@ def build_orchestrator(
         chunker         = Chunker(config=chunk_cfg),
         router          = router,
         reconstructor   = reconstructor,
-        extractor       = BibleExtractor(model=router),  # usa failover del router
+        extractor       = BibleExtractor(model=router, cache_store=repo),  # usa failover del router
         compressor      = BibleCompressor(),
+        max_in_flight   = max_in_flight,
     )
 
 
@@ -1,10 +1,18 @@
 # tenlib/orchestrator.py
 import hashlib
+import itertools
 import logging
+import mmap
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from numbers import Integral
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional
 
 from tenlib.processor.parsers.factory import ParserFactory
 from tenlib.processor.chunker.chunker import Chunker
@@ -22,8 +30,20 @@ from tenlib.context.extractor import BibleExtractor
 from tenlib.storage.repository import Repository
 from tenlib.storage.models import BookMode, BookStatus, ChunkStatus
 
+try:
+    # pyahocorasick (opcional): busca todas las palabras clave de decisiones
+    # en un solo recorrido de cada frase de las notas.
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 logger = logging.getLogger(__name__)
 
+# A partir de este tamaño el hash del libro se calcula sobre un mmap
+_MMAP_HASH_MIN_SIZE = 10 * 1024 * 1024
+# Intervalo mínimo entre dos líneas de progreso en consola (segundos)
+_PROGRESS_INTERVAL = 0.2
+
 
 class _NoopBibleExtractor:
     """Compatibilidad para tests/llamadores que no usan contexto todavía."""
@@ -40,6 +60,66 @@ class _NoopBibleExtractor:
         return None
 
 
+class _ProgressSink:
+    """
+    Escritor de progreso con límite de frecuencia.
+
+    Guarda el último (current, total, modelo, confianza) y lo escribe como
+    mucho cada `interval` segundos; el último chunk se escribe siempre.
+    Los avisos (chunk flaggeado) salen al momento, después del progreso
+    pendiente para no desordenar la salida. Al salir del bloque `with`
+    escribe lo que haya quedado sin mostrar.
+    """
+
+    def __init__(self, interval: float = _PROGRESS_INTERVAL, stream=None):
+        self._interval   = interval
+        self._stream     = stream
+        self._last_write = float("-inf")
+        self._last: Optional[tuple[str, int, int, str, float]] = None
+
+    def __enter__(self) -> "_ProgressSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+    def update(
+        self,
+        label:      str,
+        current:    int,
+        total:      int,
+        model:      str,
+        confidence: float,
+    ) -> None:
+        self._last = (label, current, total, model, confidence)
+        now = time.monotonic()
+        if current >= total or now - self._last_write >= self._interval:
+            self.flush(now)
+
+    def message(self, text: str) -> None:
+        self.flush()
+        self._write(f"[tenlib] {text}\n")
+
+    def flush(self, now: Optional[float] = None) -> None:
+        if self._last is None:
+            return
+        label, current, total, model, confidence = self._last
+        self._last = None
+        percent = int(current / total * 100)
+        self._write(
+            f"[tenlib] {label}... {current}/{total} ({percent}%)"
+            f" — modelo: {model}"
+            f" — confianza: {confidence:.2f}\n"
+        )
+        self._last_write = time.monotonic() if now is None else now
+
+    def _write(self, text: str) -> None:
+        # sys.stdout se resuelve en cada escritura (capturas de pytest/click)
+        stream = self._stream or sys.stdout
+        stream.write(text)
+        stream.flush()
+
+
 @dataclass
 class _PreparedFixChunk:
     """
@@ -100,6 +180,7 @@ class Orchestrator:
         reconstructor: Reconstructor,
         extractor:    Optional[BibleExtractor] = None,
         compressor:   Optional[BibleCompressor] = None,
+        max_in_flight: int = 1,
     ):
         self._repo          = repo
         self._parser_factory = parser_factory
@@ -108,6 +189,14 @@ class Orchestrator:
         self._reconstructor = reconstructor
         self._extractor     = extractor or _NoopBibleExtractor()
         self._compressor    = compressor or BibleCompressor()
+        # (dispositivo, inodo, mtime_ns, tamaño) → SHA-256; un archivo sin cambios no se relee
+        self._hash_cache: dict[tuple[int, int, int, int], str] = {}
+        # Chunks traducidos en paralelo. Con 1 (por defecto) cada chunk ve la
+        # Bible actualizada por el anterior; con N, los N chunks de cada
+        # ventana comparten la Bible del inicio de la ventana.
+        self._max_in_flight  = max(max_in_flight, 1)
+        self._translate_pool: Optional[ThreadPoolExecutor] = None
+        self._progress       = _ProgressSink()
 
     def run(
         self,
@@ -121,10 +210,10 @@ class Orchestrator:
         llamarlo dos veces con el mismo archivo reanuda desde donde quedó.
         """
         path = Path(file_path).resolve()
-        self._assert_file_exists(path)
+        stat = self._stat_or_raise(path)
 
         # ── Paso 1: identidad del libro por hash ──────────────────────
-        file_hash = _compute_hash(path)
+        file_hash = self._file_hash(path, stat)
         book      = self._repo.get_book_by_hash(file_hash)
         was_resumed = False
 
@@ -149,17 +238,17 @@ class Orchestrator:
             self._parse_and_store(path, book_id)
 
         # ── Paso 3: obtener chunks pendientes ─────────────────────────
-        pending = self._repo.get_pending_chunks(book_id)
+        pending_count = self._repo.count_pending_chunks(book_id)
 
-        if not pending:
+        if not pending_count:
             self._log("No hay chunks pendientes — nada que procesar")
             output_path = self._reconstruct(book_id, title, target_lang, str(path))
             return self._build_result(
                 book_id, output_path, was_resumed, flagged_ids=[]
             )
 
-        total_chunks = len(self._repo.get_all_chunks(book_id))
-        done_so_far  = total_chunks - len(pending)
+        total_chunks = self._repo.count_chunks(book_id)
+        done_so_far  = total_chunks - pending_count
 
         self._log(f"'{title}' — {total_chunks} chunks totales")
         if was_resumed:
@@ -167,7 +256,7 @@ class Orchestrator:
 
         # ── Paso 4: procesar cada chunk pendiente ─────────────────────
         flagged_ids = self._process_chunks(
-            pending     = pending,
+            pending     = self._repo.iter_pending_chunks(book_id),
             book_id     = book_id,
             source_lang = source_lang,
             target_lang = target_lang,
@@ -208,14 +297,16 @@ class Orchestrator:
         """
         source_path = Path(original_path).resolve()
         draft_path  = Path(translation_path).resolve()
-        self._assert_file_exists(source_path)
-        self._assert_file_exists(draft_path)
+        source_stat = self._stat_or_raise(source_path)
+        draft_stat  = self._stat_or_raise(draft_path)
 
-        file_hash = _compute_fix_hash(source_path, draft_path)
+        file_hash = _compute_fix_hash(
+            self._file_hash(source_path, source_stat),
+            self._file_hash(draft_path, draft_stat),
+        )
         book      = self._repo.get_book_by_hash(file_hash)
         was_resumed = False
-
-        source_chunks = self._parse_source_chunks(source_path)
+        source_by_index: Optional[dict[int, str]] = None
 
         if book:
             self._assert_book_can_run(book)
@@ -224,6 +315,8 @@ class Orchestrator:
             title       = book.title
             self._log(f"Reanudando fix de '{title}' (book_id={book_id})")
         else:
+            source_chunks   = self._parse_source_chunks(source_path)
+            source_by_index = {chunk.index: chunk.original for chunk in source_chunks}
             title   = draft_path.stem
             book_id = self._repo.create_book(
                 title       = title,
@@ -238,23 +331,30 @@ class Orchestrator:
                 translation_path = draft_path,
                 book_id          = book_id,
             )
+            self._repo.save_source_chunks(book_id, source_by_index)
 
-        pending = self._repo.get_pending_chunks(book_id)
-        if not pending:
+        pending_count = self._repo.count_pending_chunks(book_id)
+        if not pending_count:
             self._log("No hay chunks pendientes — nada que corregir")
             output_path = self._reconstruct(book_id, title, target_lang, str(draft_path))
             return self._build_result(book_id, output_path, was_resumed, flagged_ids=[])
 
-        total_chunks = len(self._repo.get_all_chunks(book_id))
-        done_so_far  = total_chunks - len(pending)
+        total_chunks = self._repo.count_chunks(book_id)
+        done_so_far  = total_chunks - pending_count
 
         self._log(f"'{title}' (fix) — {total_chunks} chunks totales")
         if was_resumed:
             self._log(f"Reanudando corrección desde chunk {done_so_far}...")
 
-        source_by_index = {chunk.index: chunk.original for chunk in source_chunks}
+        if source_by_index is None:
+            # Reanudación: el original ya quedó guardado al crear el trabajo.
+            # Trabajos anteriores a fix_sources no lo tienen → se re-parsea.
+            source_by_index = self._repo.get_source_chunks_by_index(book_id) or {
+                chunk.index: chunk.original
+                for chunk in self._parse_source_chunks(source_path)
+            }
         flagged_ids = self._process_chunks_fix(
-            pending         = pending,
+            pending         = self._repo.iter_pending_chunks(book_id),
             book_id         = book_id,
             source_by_index = source_by_index,
             source_lang     = source_lang,
@@ -292,9 +392,9 @@ class Orchestrator:
         Corrige estilo/fluidez de una traducción existente sin original de referencia.
         """
         draft_path = Path(translation_path).resolve()
-        self._assert_file_exists(draft_path)
+        draft_stat = self._stat_or_raise(draft_path)
 
-        file_hash = _compute_fix_style_hash(draft_path, target_lang)
+        file_hash = _compute_fix_style_hash(self._file_hash(draft_path, draft_stat), target_lang)
         book      = self._repo.get_book_by_hash(file_hash)
         was_resumed = False
 
@@ -316,21 +416,21 @@ class Orchestrator:
             self._log(f"Nuevo trabajo fix-style: '{title}' (book_id={book_id})")
             self._parse_and_store(draft_path, book_id)
 
-        pending = self._repo.get_pending_chunks(book_id)
-        if not pending:
+        pending_count = self._repo.count_pending_chunks(book_id)
+        if not pending_count:
             self._log("No hay chunks pendientes — nada que corregir")
             output_path = self._reconstruct(book_id, title, target_lang, str(draft_path))
             return self._build_result(book_id, output_path, was_resumed, flagged_ids=[])
 
-        total_chunks = len(self._repo.get_all_chunks(book_id))
-        done_so_far  = total_chunks - len(pending)
+        total_chunks = self._repo.count_chunks(book_id)
+        done_so_far  = total_chunks - pending_count
 
         self._log(f"'{title}' (fix-style) — {total_chunks} chunks totales")
         if was_resumed:
             self._log(f"Reanudando corrección desde chunk {done_so_far}...")
 
         flagged_ids = self._process_chunks_polish(
-            pending     = pending,
+            pending     = self._repo.iter_pending_chunks(book_id),
             book_id     = book_id,
             target_lang = target_lang,
             total       = total_chunks,
@@ -356,10 +456,89 @@ class Orchestrator:
         self._log(f"Output: {output_path}")
         return result
 
+    def close(self) -> None:
+        """Libera el pool de traducciones en paralelo (si lo hay)."""
+        if self._translate_pool is not None:
+            self._translate_pool.shutdown(wait=True)
+            self._translate_pool = None
+
     # ------------------------------------------------------------------
     # Pasos internos
     # ------------------------------------------------------------------
 
+    def _iter_translations(
+        self,
+        pending: Iterable,
+        prepare: Callable[[object], tuple[str, str]],
+        stop:    Callable[[], bool],
+    ) -> Iterator[tuple[int, object, object]]:
+        """
+        Traduce `pending` en ventanas de max_in_flight chunks y entrega
+        (i, chunk, resultado) en orden. El resultado es la ModelResponse o
+        la excepción que lanzó prepare/translate, para que el bucle la trate
+        como antes (flag del chunk o pausa por quota).
+
+        Es perezoso: `prepare` (que lee la Bible) se llama para una ventana
+        solo después de que el bucle procesó la anterior, y si `stop()` es
+        verdadero no se abre ninguna ventana más. Los hilos solo ejecutan
+        router.translate; prepare y las escrituras del bucle quedan en el
+        hilo que itera.
+        """
+        step   = self._max_in_flight
+        chunks = iter(pending)
+        start  = 0
+        while not stop() and (window := list(itertools.islice(chunks, step))):
+            requests = []
+            for chunk in window:
+                try:
+                    requests.append(prepare(chunk))
+                except Exception as e:
+                    requests.append(e)
+
+            if step == 1:
+                outcomes = [self._translate_request(requests[0])]
+            else:
+                if self._translate_pool is None:
+                    self._translate_pool = ThreadPoolExecutor(
+                        max_workers        = step,
+                        thread_name_prefix = "tenlib-translate",
+                    )
+                futures = [
+                    self._translate_pool.submit(self._translate_request, request)
+                    for request in requests
+                ]
+                outcomes = [future.result() for future in futures]
+
+            for offset, (chunk, outcome) in enumerate(zip(window, outcomes)):
+                yield start + offset, chunk, outcome
+            start += len(window)
+
+    def _translate_request(self, request) -> object:
+        if isinstance(request, Exception):
+            return request
+        user_chunk, system_prompt = request
+        try:
+            return self._router.translate(user_chunk, system_prompt)
+        except Exception as e:
+            return e
+
+    def _file_hash(self, path: Path, stat: os.stat_result) -> str:
+        """
+        _compute_hash memoizado por inodo, mtime y tamaño del archivo.
+        Entre ejecuciones (cada reanudación es un proceso nuevo) el hash se
+        recupera de la DB por ruta, mtime y tamaño; solo se relee el archivo
+        si cambió o es la primera vez que se ve.
+        """
+        key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        file_hash = self._hash_cache.get(key)
+        if file_hash is None:
+            file_hash = self._repo.get_file_hash(str(path), stat.st_mtime_ns, stat.st_size)
+            if file_hash is None:
+                file_hash = _compute_hash(path)
+                self._repo.save_file_hash(str(path), stat.st_mtime_ns, stat.st_size, file_hash)
+            self._hash_cache[key] = file_hash
+        return file_hash
+
     def _parse_and_store(self, path: Path, book_id: int) -> None:
         """Parsea el archivo, chunkea y guarda todos en PENDING."""
         raw_book = self._parser_factory.parse(str(path))
@@ -408,7 +587,7 @@ class Orchestrator:
 
     def _process_chunks(
         self,
-        pending:     list,
+        pending:     Iterable,
         book_id:     int,
         source_lang: str,
         target_lang: str,
@@ -420,110 +599,46 @@ class Orchestrator:
         Cada chunk tiene su propio try/except — un fallo no detiene el pipeline.
         Devuelve la lista de chunk_ids que quedaron FLAGGED.
         """
-        flagged_ids: list[int] = []
-
         bible = self._load_or_init_bible(book_id)
 
-        for i, chunk in enumerate(pending):
-            current = offset + i + 1
-            percent = int(current / total * 100)
-
-            try:
-                # ── ANTES: comprimir Bible al contexto del chunk ──────
-                compressed = self._compressor.compress(bible, chunk.original)
-                ratio      = self._compressor.compression_ratio(bible, compressed)
-
+        def prepare(chunk) -> tuple[str, str]:
+            # ── ANTES: comprimir Bible al contexto del chunk ──────
+            compressed = self._compressor.compress(bible, chunk.original)
+            # compression_ratio recorre la Bible: solo vale la pena si se loguea
+            if logger.isEnabledFor(logging.DEBUG):
+                ratio = self._compressor.compression_ratio(bible, compressed)
                 if ratio < 1.0:
                     logger.debug(
                         "Bible comprimida: %.0f%% de entradas relevantes para chunk %d",
                         ratio * 100, chunk.chunk_index,
                     )
 
-                system_prompt = build_translate_prompt(
-                    source_lang = source_lang,
-                    target_lang = target_lang,
-                    voice       = compressed.voice,
-                    decisions   = compressed.decisions,
-                    glossary    = compressed.glossary,
-                    characters  = compressed.characters,
-                    last_scene  = compressed.last_scene,
-                )
-
-                # ── Traducir ──────────────────────────────────────────
-                response = self._router.translate(chunk.original, system_prompt)
-
-                self._repo.update_chunk_translation(
-                    chunk_id   = chunk.id,
-                    translated = response.translation,
-                    model_used = response.model_used,
-                    confidence = response.confidence,
-                    status     = self._resolve_status(response.confidence),
-                )
-
-                # ── DESPUÉS: actualizar Bible con lo aprendido ────────
-                # 1. Detectar candidatos una sola vez (detector local rápido)
-                local_characters = extract_character_mentions(
-                    source_text         = chunk.original,
-                    translated_text     = response.translation,
-                    existing_characters = bible.characters,
-                )
-
-                # 2. Extractor IA valida/enriquece los candidatos locales.
-                # Forzar extracción si hay candidatos nuevos o sin enriquecer
-                # para que el AI los enriquezca en el mismo chunk donde aparecen.
-                extracted_update = self._extractor.extract(
-                    original             = chunk.original,
-                    translation          = response.translation,
-                    notes                = response.notes,
-                    chunk_index          = chunk.chunk_index,
-                    character_candidates = local_characters,
-                    force                = _has_unenriched_candidates(local_characters, bible),
-                )
-
-                # 3. Update local: voz, decisiones, last_scene + candidatos como fallback
-                local_update = _build_local_bible_update(
-                    source_text         = chunk.original,
-                    translated_text     = response.translation,
-                    notes               = response.notes,
-                    existing_voice      = bible.voice,
-                    detected_characters = local_characters,
-                )
-                merged_update = _merge_bible_updates(local_update, extracted_update)
-                bible.apply(merged_update)
-                version = self._repo.save_bible(book_id, bible)
-                logger.debug("Bible actualizada a versión %d", version)
-
-                print(
-                    f"[tenlib] Traduciendo... {current}/{total} ({percent}%)"
-                    f" — modelo: {response.model_used}"
-                    f" — confianza: {response.confidence:.2f}"
-                )
-
-            except AllModelsExhaustedError as e:
-                logger.error("Todos los modelos agotados: %s", e)
-                self._log(
-                    f"⚠ Pipeline pausado en chunk {current}/{total}. "
-                    f"Reejecutar cuando haya quota disponible."
-                )
-                break
-
-            except Exception as e:
-                logger.warning("Error en chunk %d: %s", chunk.chunk_index, e)
-                self._repo.flag_chunk(
-                    chunk_id = chunk.id,
-                    flags    = [f"error: {type(e).__name__}: {e}"],
-                )
-                flagged_ids.append(chunk.id)
-                print(
-                    f"[tenlib] ⚠ Chunk {current}/{total} flaggeado"
-                    f" ({type(e).__name__}) — continuando"
-                )
+            system_prompt = build_translate_prompt(
+                source_lang = source_lang,
+                target_lang = target_lang,
+                voice       = compressed.voice,
+                decisions   = compressed.decisions,
+                glossary    = compressed.glossary,
+                characters  = compressed.characters,
+                last_scene  = compressed.last_scene,
+            )
+            return chunk.original, system_prompt
 
-        return flagged_ids
+        return self._run_chunk_loop(
+            pending     = pending,
+            book_id     = book_id,
+            bible       = bible,
+            prepare     = prepare,
+            source_text = lambda chunk: chunk.original,
+            verb        = "Traduciendo",
+            mode        = "",
+            total       = total,
+            offset      = offset,
+        )
 
     def _process_chunks_fix(
         self,
-        pending: list,
+        pending: Iterable,
         book_id: int,
         source_by_index: dict[int, str],
         source_lang: str,
@@ -536,13 +651,9 @@ class Orchestrator:
         - chunk.original: traducción existente a corregir
         - source_by_index[idx]: original de referencia
         """
-        flagged_ids: list[int] = []
         bible = self._load_or_init_bible(book_id)
 
-        for i, chunk in enumerate(pending):
-            current = offset + i + 1
-            percent = int(current / total * 100)
-
+        def prepare(chunk) -> tuple[str, str]:
             source_chunk = source_by_index.get(chunk.chunk_index, "")
             draft_chunk  = chunk.original
 
@@ -552,104 +663,54 @@ class Orchestrator:
                     chunk.chunk_index,
                 )
 
-            try:
-                compressed = self._compressor.compress(
-                    bible,
-                    source_chunk or draft_chunk,
-                )
+            compressed = self._compressor.compress(
+                bible,
+                source_chunk or draft_chunk,
+            )
+            if logger.isEnabledFor(logging.DEBUG):
                 ratio = self._compressor.compression_ratio(bible, compressed)
-
                 if ratio < 1.0:
                     logger.debug(
                         "Bible comprimida (fix): %.0f%% para chunk %d",
                         ratio * 100, chunk.chunk_index,
                     )
 
-                system_prompt = build_fix_prompt(
-                    source_lang = source_lang,
-                    target_lang = target_lang,
-                    voice       = compressed.voice,
-                    decisions   = compressed.decisions,
-                    glossary    = compressed.glossary,
-                    characters  = compressed.characters,
-                    last_scene  = compressed.last_scene,
-                )
-
-                user_chunk = _build_fix_chunk_payload(
-                    source_chunk   = source_chunk,
-                    draft_chunk    = draft_chunk,
-                    source_lang    = source_lang,
-                    target_lang    = target_lang,
-                )
-
-                response = self._router.translate(user_chunk, system_prompt)
-
-                self._repo.update_chunk_translation(
-                    chunk_id   = chunk.id,
-                    translated = response.translation,
-                    model_used = response.model_used,
-                    confidence = response.confidence,
-                    status     = self._resolve_status(response.confidence),
-                )
-
-                local_characters = extract_character_mentions(
-                    source_text         = source_chunk or draft_chunk,
-                    translated_text     = response.translation,
-                    existing_characters = bible.characters,
-                )
-
-                extracted_update = self._extractor.extract(
-                    original             = source_chunk or draft_chunk,
-                    translation          = response.translation,
-                    notes                = response.notes,
-                    chunk_index          = chunk.chunk_index,
-                    character_candidates = local_characters,
-                    force                = _has_unenriched_candidates(local_characters, bible),
-                )
-
-                local_update = _build_local_bible_update(
-                    source_text         = source_chunk or draft_chunk,
-                    translated_text     = response.translation,
-                    notes               = response.notes,
-                    existing_voice      = bible.voice,
-                    detected_characters = local_characters,
-                )
-                merged_update = _merge_bible_updates(local_update, extracted_update)
-                bible.apply(merged_update)
-                version = self._repo.save_bible(book_id, bible)
-                logger.debug("Bible actualizada (fix) a versión %d", version)
-
-                print(
-                    f"[tenlib] Corrigiendo... {current}/{total} ({percent}%)"
-                    f" — modelo: {response.model_used}"
-                    f" — confianza: {response.confidence:.2f}"
-                )
-
-            except AllModelsExhaustedError as e:
-                logger.error("Todos los modelos agotados en fix: %s", e)
-                self._log(
-                    f"⚠ Pipeline fix pausado en chunk {current}/{total}. "
-                    f"Reejecutar cuando haya quota disponible."
-                )
-                break
+            system_prompt = build_fix_prompt(
+                source_lang = source_lang,
+                target_lang = target_lang,
+                voice       = compressed.voice,
+                decisions   = compressed.decisions,
+                glossary    = compressed.glossary,
+                characters  = compressed.characters,
+                last_scene  = compressed.last_scene,
+            )
 
-            except Exception as e:
-                logger.warning("Error en chunk fix %d: %s", chunk.chunk_index, e)
-                self._repo.flag_chunk(
-                    chunk_id = chunk.id,
-                    flags    = [f"error: {type(e).__name__}: {e}"],
-                )
-                flagged_ids.append(chunk.id)
-                print(
-                    f"[tenlib] ⚠ Chunk {current}/{total} flaggeado"
-                    f" ({type(e).__name__}) — continuando"
-                )
+            user_chunk = _build_fix_chunk_payload(
+                source_chunk   = source_chunk,
+                draft_chunk    = draft_chunk,
+                source_lang    = source_lang,
+                target_lang    = target_lang,
+            )
+            return user_chunk, system_prompt
 
-        return flagged_ids
+        # La Bible aprende del original de referencia; sin él, del borrador
+        return self._run_chunk_loop(
+            pending     = pending,
+            book_id     = book_id,
+            bible       = bible,
+            prepare     = prepare,
+            source_text = lambda chunk: (
+                source_by_index.get(chunk.chunk_index, "") or chunk.original
+            ),
+            verb        = "Corrigiendo",
+            mode        = "fix",
+            total       = total,
+            offset      = offset,
+        )
 
     def _process_chunks_polish(
         self,
-        pending: list,
+        pending: Iterable,
         book_id: int,
         target_lang: str,
         total: int,
@@ -658,100 +719,158 @@ class Orchestrator:
         """
         Itera chunks pendientes del modo fix-style (sin original).
         """
-        flagged_ids: list[int] = []
         bible = self._load_or_init_bible(book_id)
 
-        for i, chunk in enumerate(pending):
-            current = offset + i + 1
-            percent = int(current / total * 100)
-
-            try:
-                compressed = self._compressor.compress(bible, chunk.original)
+        def prepare(chunk) -> tuple[str, str]:
+            compressed = self._compressor.compress(bible, chunk.original)
+            if logger.isEnabledFor(logging.DEBUG):
                 ratio = self._compressor.compression_ratio(bible, compressed)
-
                 if ratio < 1.0:
                     logger.debug(
                         "Bible comprimida (fix-style): %.0f%% para chunk %d",
                         ratio * 100, chunk.chunk_index,
                     )
 
-                system_prompt = build_polish_prompt(
-                    target_lang = target_lang,
-                    voice       = compressed.voice,
-                    decisions   = compressed.decisions,
-                    glossary    = compressed.glossary,
-                    characters  = compressed.characters,
-                    last_scene  = compressed.last_scene,
-                )
+            system_prompt = build_polish_prompt(
+                target_lang = target_lang,
+                voice       = compressed.voice,
+                decisions   = compressed.decisions,
+                glossary    = compressed.glossary,
+                characters  = compressed.characters,
+                last_scene  = compressed.last_scene,
+            )
 
-                user_chunk = _build_polish_chunk_payload(
-                    draft_chunk = chunk.original,
-                    target_lang = target_lang,
-                )
+            user_chunk = _build_polish_chunk_payload(
+                draft_chunk = chunk.original,
+                target_lang = target_lang,
+            )
+            return user_chunk, system_prompt
 
-                response = self._router.translate(user_chunk, system_prompt)
+        # En fix-style el extractor corre en el primer chunk y cada N chunks
+        # para capturar voz narrativa y decisiones de estilo.
+        return self._run_chunk_loop(
+            pending     = pending,
+            book_id     = book_id,
+            bible       = bible,
+            prepare     = prepare,
+            source_text = lambda chunk: chunk.original,
+            verb        = "Corrigiendo estilo",
+            mode        = "fix-style",
+            total       = total,
+            offset      = offset,
+        )
 
-                self._repo.update_chunk_translation(
-                    chunk_id   = chunk.id,
-                    translated = response.translation,
-                    model_used = response.model_used,
-                    confidence = response.confidence,
-                    status     = self._resolve_status(response.confidence),
-                )
+    def _run_chunk_loop(
+        self,
+        pending:     Iterable,
+        book_id:     int,
+        bible:       BookBible,
+        prepare:     Callable[[object], tuple[str, str]],
+        source_text: Callable[[object], str],
+        verb:        str,
+        mode:        str,
+        total:       int,
+        offset:      int,
+    ) -> list[int]:
+        """
+        Bucle común a los tres modos. Lo que cambia entre ellos llega como
+        callables:
+        - prepare(chunk)     → (user_chunk, system_prompt) para el modelo
+        - source_text(chunk) → texto del que la Bible aprende personajes/escena
+        `verb` es la etiqueta del progreso y `mode` ("", "fix", "fix-style")
+        solo distingue los mensajes de log.
+        """
+        flagged_ids: list[int] = []
+        tag = f" {mode}" if mode else ""
+        # Tras agotarse la quota se terminan de guardar los chunks de la
+        # ventana que ya volvieron traducidos; no se abre otra.
+        paused = False
+
+        with (
+            self._repo.chunk_batch(book_id, bible) as chunk_writes,
+            self._progress,
+        ):
+            for i, chunk, outcome in self._iter_translations(pending, prepare, lambda: paused):
+                current = offset + i + 1
+
+                try:
+                    response = _unwrap_outcome(outcome)
+
+                    chunk_writes.update_chunk_translation(
+                        chunk_id   = chunk.id,
+                        translated = response.translation,
+                        model_used = response.model_used,
+                        confidence = response.confidence,
+                        status     = self._resolve_status(response.confidence),
+                    )
 
-                local_characters = extract_character_mentions(
-                    source_text         = chunk.original,
-                    translated_text     = response.translation,
-                    existing_characters = bible.characters,
-                )
+                    # ── DESPUÉS: actualizar Bible con lo aprendido ────────
+                    # 1. Detectar candidatos una sola vez (detector local rápido)
+                    source = source_text(chunk)
+                    local_characters = extract_character_mentions(
+                        source_text               = source,
+                        translated_text           = response.translation,
+                        existing_characters       = bible.characters,
+                        existing_characters_index = bible.character_name_index(),
+                    )
 
-                # En fix-style llamamos al extractor para el primer chunk y
-                # cada N chunks para capturar voz narrativa y decisiones de estilo.
-                extracted_update = self._extractor.extract(
-                    original             = chunk.original,
-                    translation          = response.translation,
-                    notes                = response.notes,
-                    chunk_index          = chunk.chunk_index,
-                    character_candidates = local_characters,
-                    force                = _has_unenriched_candidates(local_characters, bible),
-                )
-                local_update = _build_local_bible_update(
-                    source_text         = chunk.original,
-                    translated_text     = response.translation,
-                    notes               = response.notes,
-                    existing_voice      = bible.voice,
-                    detected_characters = local_characters,
-                )
-                merged_update = _merge_bible_updates(local_update, extracted_update)
-                bible.apply(merged_update)
-                version = self._repo.save_bible(book_id, bible)
-                logger.debug("Bible actualizada (fix-style) a versión %d", version)
-
-                print(
-                    f"[tenlib] Corrigiendo estilo... {current}/{total} ({percent}%)"
-                    f" — modelo: {response.model_used}"
-                    f" — confianza: {response.confidence:.2f}"
-                )
+                    # 2. Extractor IA valida/enriquece los candidatos locales.
+                    # Forzar extracción si hay candidatos nuevos o sin enriquecer
+                    # para que el AI los enriquezca en el mismo chunk donde aparecen.
+                    extracted_update = self._extractor.extract(
+                        original             = source,
+                        translation          = response.translation,
+                        notes                = response.notes,
+                        chunk_index          = chunk.chunk_index,
+                        character_candidates = local_characters,
+                        force                = _has_unenriched_candidates(local_characters, bible),
+                    )
 
-            except AllModelsExhaustedError as e:
-                logger.error("Todos los modelos agotados en fix-style: %s", e)
-                self._log(
-                    f"⚠ Pipeline fix-style pausado en chunk {current}/{total}. "
-                    f"Reejecutar cuando haya quota disponible."
-                )
-                break
+                    # 3. Update local: voz, decisiones, last_scene + candidatos como fallback
+                    local_update = _build_local_bible_update(
+                        source_text         = source,
+                        translated_text     = response.translation,
+                        notes               = response.notes,
+                        existing_voice      = bible.voice,
+                        detected_characters = local_characters,
+                    )
+                    merged_update = _merge_bible_updates(local_update, extracted_update)
+                    if merged_update != BibleUpdate():
+                        bible.apply(merged_update)
+                        chunk_writes.mark_bible_dirty()
+
+                    self._progress.update(
+                        label      = verb,
+                        current    = current,
+                        total      = total,
+                        model      = response.model_used,
+                        confidence = response.confidence,
+                    )
 
-            except Exception as e:
-                logger.warning("Error en chunk fix-style %d: %s", chunk.chunk_index, e)
-                self._repo.flag_chunk(
-                    chunk_id = chunk.id,
-                    flags    = [f"error: {type(e).__name__}: {e}"],
-                )
-                flagged_ids.append(chunk.id)
-                print(
-                    f"[tenlib] ⚠ Chunk {current}/{total} flaggeado"
-                    f" ({type(e).__name__}) — continuando"
-                )
+                except AllModelsExhaustedError as e:
+                    if paused:
+                        continue
+                    paused = True
+                    logger.error(
+                        "Todos los modelos agotados%s: %s",
+                        f" en {mode}" if mode else "", e,
+                    )
+                    self._progress.message(
+                        f"⚠ Pipeline{tag} pausado en chunk {current}/{total}. "
+                        f"Reejecutar cuando haya quota disponible."
+                    )
+
+                except Exception as e:
+                    logger.warning("Error en chunk%s %d: %s", tag, chunk.chunk_index, e)
+                    chunk_writes.flag_chunk(
+                        chunk_id = chunk.id,
+                        flags    = [f"error: {type(e).__name__}: {e}"],
+                    )
+                    flagged_ids.append(chunk.id)
+                    self._progress.message(
+                        f"⚠ Chunk {current}/{total} flaggeado"
+                        f" ({type(e).__name__}) — continuando"
+                    )
 
         return flagged_ids
 
@@ -781,9 +900,15 @@ class Orchestrator:
     # ------------------------------------------------------------------
 
     @staticmethod
-    def _assert_file_exists(path: Path) -> None:
-        if not path.exists():
-            raise FileNotFoundError(f"Archivo no encontrado: {path}")
+    def _stat_or_raise(path: Path) -> os.stat_result:
+        """
+        Un solo stat: comprueba que el archivo existe y devuelve el resultado
+        para la clave del caché de hashes.
+        """
+        try:
+            return os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            raise FileNotFoundError(f"Archivo no encontrado: {path}") from None
 
     @staticmethod
     def _resolve_status(confidence: float) -> ChunkStatus:
@@ -836,31 +961,42 @@ class Orchestrator:
 # Funciones de módulo (helpers privados)
 # ------------------------------------------------------------------
 
+def _unwrap_outcome(outcome):
+    """Devuelve la respuesta de _iter_translations o relanza su excepción."""
+    if isinstance(outcome, Exception):
+        raise outcome
+    return outcome
+
+
 def _compute_hash(path: Path) -> str:
-    """SHA-256 del archivo — identifica el libro independientemente del nombre."""
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        for block in iter(lambda: f.read(65536), b""):
-            h.update(block)
-    return h.hexdigest()
+    """
+    SHA-256 del archivo — identifica el libro independientemente del nombre.
+    El algoritmo no se cambia: el hash es la clave con la que se reanudan
+    los libros ya guardados en la base de datos.
+    """
+    with path.open("rb", buffering=0) as f:
+        if os.fstat(f.fileno()).st_size >= _MMAP_HASH_MIN_SIZE:
+            # Archivos grandes: una sola llamada sobre las páginas mapeadas
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return hashlib.sha256(mm).hexdigest()
+        # file_digest lee por bloques con readinto, sin copias en Python
+        return hashlib.file_digest(f, "sha256").hexdigest()
 
 
-def _compute_fix_hash(original_path: Path, translation_path: Path) -> str:
+def _compute_fix_hash(original_hash: str, translation_hash: str) -> str:
     """
-    Hash estable para modo fix usando ambos archivos.
+    Hash estable para modo fix a partir del hash de ambos archivos.
     Evita colisiones entre trabajos translate vs fix.
     """
-    combined = (
-        f"fix|{_compute_hash(original_path)}|{_compute_hash(translation_path)}"
-    )
+    combined = f"fix|{original_hash}|{translation_hash}"
     return hashlib.sha256(combined.encode("utf-8")).hexdigest()
 
 
-def _compute_fix_style_hash(translation_path: Path, target_lang: str) -> str:
+def _compute_fix_style_hash(translation_hash: str, target_lang: str) -> str:
     """
     Hash estable para modo fix-style (sin original).
     """
-    combined = f"fix_style|{target_lang.lower()}|{_compute_hash(translation_path)}"
+    combined = f"fix_style|{target_lang.lower()}|{translation_hash}"
     return hashlib.sha256(combined.encode("utf-8")).hexdigest()
 
 
@@ -889,6 +1025,11 @@ def _align_translation_by_reference_chunks(
     return _split_text_by_reference_lengths(translation_text, chunk_lengths)
 
 
+# Límite natural para cortar: justo tras un salto de línea, o tras
+# puntuación fuerte (.?!;:) seguida de espacio.
+_NATURAL_BREAK_RE = re.compile(r"(?<=\n)|(?<=[.?!;:])(?=\s)")
+
+
 def _split_text_by_reference_lengths(text: str, reference_lengths: list[int]) -> list[str]:
     if not reference_lengths:
         return []
@@ -931,29 +1072,21 @@ def _snap_split_index(text: str, target: int, start: int) -> int:
     target = max(min_idx, min(target, max_idx))
     window = 120
 
-    for radius in range(window + 1):
-        left = target - radius
-        right = target + radius
-
-        if left >= min_idx and _is_natural_break(text, left):
-            return left
-        if right <= max_idx and _is_natural_break(text, right):
-            return right
-
-    return target
-
-
-def _is_natural_break(text: str, idx: int) -> bool:
-    prev_char = text[idx - 1] if idx > 0 else ""
-    curr_char = text[idx] if idx < len(text) else ""
-
-    if prev_char == "\n":
-        return True
-
-    if prev_char in ".?!;:" and (curr_char.isspace() or curr_char == "\n"):
-        return True
+    # El límite natural más cercano al objetivo; a igual distancia gana el
+    # de la izquierda. Un solo finditer sobre la ventana en lugar de probar
+    # posición a posición.
+    best = None
+    last = min(max_idx, target + window)
+    for match in _NATURAL_BREAK_RE.finditer(text, max(min_idx, target - window), last + 1):
+        idx = match.start()
+        if idx > last:
+            break
+        if best is None or abs(idx - target) < abs(best - target):
+            best = idx
+        elif idx > target:
+            break
 
-    return False
+    return target if best is None else best
 
 
 def _build_fix_chunk_payload(
@@ -988,17 +1121,19 @@ def _build_polish_chunk_payload(draft_chunk: str, target_lang: str) -> str:
     )
 
 
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+
 def _scene_digest(text: str, max_chars: int = 280) -> str:
     """
     Resumen corto y determinístico para continuidad cuando no se usa extractor IA.
     """
-    import re
-
     clean = " ".join((text or "").split()).strip()
     if not clean:
         return "Sin contenido suficiente para resumir la escena."
 
-    sentences = re.split(r"(?<=[.!?])\s+", clean)
+    # Solo se usan las dos primeras oraciones: no hace falta partir el resto
+    sentences = _SENTENCE_SPLIT_RE.split(clean, maxsplit=2)
     summary = " ".join(s for s in sentences[:2] if s).strip()
 
     if not summary:
@@ -1022,11 +1157,11 @@ def _has_unenriched_candidates(
     """
     if not candidates:
         return False
-    return any(
-        name not in bible.characters
-        or bible.characters[name] == _GENERIC_DESC
-        for name in candidates
-    )
+    characters = bible.characters
+    # Comparación de vistas de claves en C: algún candidato es nuevo
+    if not candidates.keys() <= characters.keys():
+        return True
+    return any(characters[name] == _GENERIC_DESC for name in candidates)
 
 
 _DEFAULT_VOICE = "narrador en tercera persona, tiempo pasado"
@@ -1098,31 +1233,41 @@ def _merge_bible_updates(
         rejected   = extracted_update.rejected,
     )
 
+
+# Pronombres de cada persona, entre espacios: cuenta cuántos distintos aparecen
+_FIRST_PERSON_TOKENS = (" yo ", " me ", " mi ", " mí ", " conmigo ", " nosotros ", " nos ")
+_THIRD_PERSON_TOKENS = (" él ", " ella ", " ellos ", " ellas ", " le ", " les ", " su ", " sus ")
+# Verbos de pasado y presente en una sola pasada; el grupo indica el tiempo
+_TENSE_RE = re.compile(
+    r"\b(?:(?P<past>fue|era|estaba|había|dijo|pensó|miró|entró)"
+    r"|(?P<present>es|está|dice|piensa|mira|entra|hay))\b"
+)
+
+
 def _infer_narrative_voice(text: str, fallback: str) -> str:
     """
     Infiere voz narrativa de forma aproximada para mantener consistencia.
     """
-    import re
+    if not text.strip():
+        return fallback
 
     lowered = f" {text.lower()} "
-    first_person_hits = sum(
-        1 for token in [" yo ", " me ", " mi ", " mí ", " conmigo ", " nosotros ", " nos "]
-        if token in lowered
-    )
-    third_person_hits = sum(
-        1 for token in [" él ", " ella ", " ellos ", " ellas ", " le ", " les ", " su ", " sus "]
-        if token in lowered
-    )
+    first_person_hits = sum(1 for token in _FIRST_PERSON_TOKENS if token in lowered)
+    third_person_hits = sum(1 for token in _THIRD_PERSON_TOKENS if token in lowered)
 
     person = "primera persona" if first_person_hits >= max(2, third_person_hits + 1) else "tercera persona"
 
-    past_hits = len(re.findall(r"\b(fue|era|estaba|había|dijo|pensó|miró|entró)\b", lowered))
-    present_hits = len(re.findall(r"\b(es|está|dice|piensa|mira|entra|hay)\b", lowered))
+    past_hits    = 0
+    present_hits = 0
+    for match in _TENSE_RE.finditer(lowered):
+        if match.lastgroup == "past":
+            past_hits += 1
+        else:
+            present_hits += 1
 
     tense = "tiempo pasado" if past_hits >= present_hits else "tiempo presente"
 
-    inferred = f"narrador en {person}, {tense}"
-    return inferred if text.strip() else fallback
+    return f"narrador en {person}, {tense}"
 
 
 _DECISION_KEYWORDS = {
@@ -1132,6 +1277,16 @@ _DECISION_KEYWORDS = {
 }
 
 
+@lru_cache(maxsize=1)
+def _decision_automaton():
+    """Autómata Aho-Corasick de _DECISION_KEYWORDS, construido una sola vez."""
+    automaton = ahocorasick.Automaton()
+    for keyword in _DECISION_KEYWORDS:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
 def _extract_style_decisions(notes: str, max_items: int = 5) -> list[str]:
     """
     Extrae decisiones de estilo breves desde notes cuando existan pistas explícitas.
@@ -1140,13 +1295,19 @@ def _extract_style_decisions(notes: str, max_items: int = 5) -> list[str]:
     if not notes:
         return []
 
+    automaton = _decision_automaton() if ahocorasick is not None else None
+
     decisions: list[str] = []
     for sentence in notes.split("."):
         fragment = sentence.strip()
         if not fragment:
             continue
         lowered = fragment.lower()
-        if any(k in lowered for k in _DECISION_KEYWORDS):
+        if automaton is not None:
+            has_keyword = next(automaton.iter(lowered), None) is not None
+        else:
+            has_keyword = any(k in lowered for k in _DECISION_KEYWORDS)
+        if has_keyword:
             decisions.append(fragment)
         if len(decisions) >= max_items:
             break
@@ -1154,10 +1315,13 @@ def _extract_style_decisions(notes: str, max_items: int = 5) -> list[str]:
     return decisions
 
 
+_SLUG_NONWORD_RE = re.compile(r"[^\w\s-]")
+_SLUG_SPACES_RE  = re.compile(r"[\s]+")
+
+
 def _slugify(title: str) -> str:
     """Convierte el título en un nombre de archivo seguro."""
-    import re
     slug = title.lower().strip()
-    slug = re.sub(r"[^\w\s-]", "", slug)
-    slug = re.sub(r"[\s]+", "_", slug)
+    slug = _SLUG_NONWORD_RE.sub("", slug)
+    slug = _SLUG_SPACES_RE.sub("_", slug)
     return slug
@@ -20,16 +20,14 @@ class Chunker:
 
     def chunk(self, book: RawBook) -> list[Chunk]:
         all_chunks: list[Chunk] = []
-        global_index = 0
 
         for section_idx, section_text in enumerate(book.sections):
             segments = self._detector.detect(section_text, source_section=section_idx)
             chunks = self._normalizer.normalize(segments)
 
             # Re-indexar globalmente (el normalizer indexa por sección)
-            for chunk in chunks:
+            for global_index, chunk in enumerate(chunks, start=len(all_chunks)):
                 chunk.index = global_index
-                global_index += 1
-                all_chunks.append(chunk)
+            all_chunks.extend(chunks)
 
         return all_chunks
\ No newline at end of file
@@ -2,6 +2,9 @@ import re
 from .models import TextSegment, BoundaryType, ChunkConfig
 from .token_estimator import TokenEstimator
 
+# Referencias a grupos (\1, (?P=nombre)): cambian de sentido al unir patrones
+_BACKREF_RE = re.compile(r'\\[1-9]|\(\?P=')
+
 class BoundaryDetector:
     """
     Responsabilidad unica: tomar texto plano y devolver lista de textsegments
@@ -111,26 +114,43 @@ class BoundaryDetector:
         return None
 
     def _compile_patterns(self) -> dict[BoundaryType, list[re.Pattern]]:
-        """Compila los patrones regex para optimizar el detector."""
+        """
+        Compila los patrones regex para optimizar el detector.
+        Los patrones de cada categoría se unen en una sola alternancia: una
+        línea se prueba una vez por categoría en vez de una vez por patrón.
+        """
         return {
-            BoundaryType.CHAPTER: [
-                re.compile(p, re.IGNORECASE | re.MULTILINE)
-                for p in self._config.chapter_patterns
-            ],
-            BoundaryType.SCENE: [
-                re.compile(p, re.MULTILINE)
-                for p in self._config.scene_patterns
-            ],
-            BoundaryType.POV: [
-                re.compile(p, re.MULTILINE)
-                for p in self._config.pov_patterns
-            ],
-            BoundaryType.PARAGRAPH: [
-                re.compile(p, re.MULTILINE)
-                for p in self._config.paragraph_patterns
-            ],
-            BoundaryType.SENTENCE: [
-                re.compile(p, re.MULTILINE)
-                for p in self._config.sentence_patterns
-            ],
-        }
\ No newline at end of file
+            BoundaryType.CHAPTER: _compile_union(
+                self._config.chapter_patterns, re.IGNORECASE | re.MULTILINE,
+            ),
+            BoundaryType.SCENE: _compile_union(
+                self._config.scene_patterns, re.MULTILINE,
+            ),
+            BoundaryType.POV: _compile_union(
+                self._config.pov_patterns, re.MULTILINE,
+            ),
+            BoundaryType.PARAGRAPH: _compile_union(
+                self._config.paragraph_patterns, re.MULTILINE,
+            ),
+            BoundaryType.SENTENCE: _compile_union(
+                self._config.sentence_patterns, re.MULTILINE,
+            ),
+        }
+
+
+def _compile_union(patterns: list[str], flags: int) -> list[re.Pattern]:
+    """
+    Une los patrones en `(?:p1)|(?:p2)|...`. Con match() la alternancia
+    acierta si acierta alguno de ellos, igual que probarlos uno a uno.
+    Si un patrón personalizado no admite la unión (referencias a grupos
+    por número, flags globales en mitad del patrón) se compilan por
+    separado como antes.
+    """
+    if not patterns:
+        return []
+    if any(_BACKREF_RE.search(p) for p in patterns):
+        return [re.compile(p, flags) for p in patterns]
+    try:
+        return [re.compile("|".join(f"(?:{p})" for p in patterns), flags)]
+    except re.error:
+        return [re.compile(p, flags) for p in patterns]
@@ -1,4 +1,6 @@
 import os
+import sys
+from functools import lru_cache
 from tenlib.processor.models import RawBook
 from .base import BaseParser
 from .txt_parser import TxtParser
@@ -11,6 +13,19 @@ class UnsupportedFormatError(Exception):
     pass
 
 
+@lru_cache(maxsize=None)
+def _parser_extensions(parser_cls: type) -> frozenset[str]:
+    """
+    Extensiones que declara un parser, calculadas una vez por clase.
+    Convención: la clase o su módulo exponen _SUPPORTED_EXTENSIONS.
+    """
+    exts = getattr(parser_cls, "_SUPPORTED_EXTENSIONS", None)
+    if exts is None:
+        module = sys.modules[parser_cls.__module__]
+        exts = getattr(module, "_SUPPORTED_EXTENSIONS", ())
+    return frozenset(exts)
+
+
 class ParserFactory:
     """
     Registro central de parsers.
@@ -64,16 +79,11 @@ class ParserFactory:
         )
 
     def _supported_extensions(self) -> str:
+        """Extensiones de los parsers de esta instancia, incluidos los registrados."""
         exts: set[str] = set()
         for parser in self._parsers:
-            # convención: los parsers exponen _SUPPORTED_EXTENSIONS si quieren
-            if hasattr(parser, '__class__'):
-                module = vars(parser.__class__.__module__ and
-                              __import__(parser.__class__.__module__,
-                                         fromlist=['_SUPPORTED_EXTENSIONS'])
-                              or {})
-                # fallback: simplemente listamos los parsers por nombre
-        return ".txt, .md, .epub"
+            exts.update(_parser_extensions(type(parser)))
+        return ", ".join(sorted(exts))
 
     # ------------------------------------------------------------------ #
     #  Método de clase para uso rápido sin instanciar                     #
@@ -8,8 +8,12 @@ _CHAPTER_RE = re.compile(
     r'^\s*(cap[ií]tulo|chapter|parte|part|prologue|pr[oó]logo)\s*[\divxlc]*',
     re.IGNORECASE,
 )
+# Mismo patrón aplicado a cualquier línea de la página en una sola búsqueda
+_CHAPTER_LINE_RE = re.compile(_CHAPTER_RE.pattern, re.IGNORECASE | re.MULTILINE)
 _MIN_SECTION_WORDS = 40
 
+_SUPPORTED_EXTENSIONS = {'.pdf'}
+
 
 class PdfParser(BaseParser):
     """
@@ -23,7 +27,8 @@ class PdfParser(BaseParser):
     """
 
     def can_handle(self, file_path: str) -> bool:
-        return file_path.lower().endswith(".pdf")
+        _, ext = os.path.splitext(file_path)
+        return ext.lower() in _SUPPORTED_EXTENSIONS
 
     def parse(self, file_path: str) -> RawBook:
         try:
@@ -33,12 +38,18 @@ class PdfParser(BaseParser):
                 "El soporte PDF requiere pymupdf. Instálalo con: pip install pymupdf"
             )
 
+        # Una sola pasada: se extrae cada página y se descartan al momento las
+        # vacías o casi vacías (portada, índice con solo números)
         doc   = fitz.open(file_path)
-        pages = [page.get_text("text").strip() for page in doc]
-        doc.close()
-
-        # Filtrar páginas vacías o casi vacías (portada, índice con solo números)
-        pages = [p for p in pages if len(p.split()) >= 5]
+        pages = []
+        try:
+            for page in doc:
+                text = page.get_text("text").strip()
+                # maxsplit=4 basta para saber si hay al menos 5 palabras
+                if len(text.split(None, 4)) >= 5:
+                    pages.append(text)
+        finally:
+            doc.close()
 
         title    = self._extract_title(pages, file_path)
         sections = self._group_sections(pages)
@@ -72,10 +83,7 @@ class PdfParser(BaseParser):
         return self._merge_short_pages(pages)
 
     def _has_chapter_markers(self, pages: list[str]) -> bool:
-        matches = sum(
-            1 for p in pages
-            if any(_CHAPTER_RE.match(line) for line in p.split("\n"))
-        )
+        matches = sum(1 for p in pages if _CHAPTER_LINE_RE.search(p))
         return matches >= 2
 
     def _split_by_chapters(self, pages: list[str]) -> list[str]:
@@ -83,7 +91,7 @@ class PdfParser(BaseParser):
         current: list[str] = []
 
         for page in pages:
-            first_line = page.split("\n")[0].strip()
+            first_line = page.partition("\n")[0].strip()
             is_chapter = bool(_CHAPTER_RE.match(first_line))
             if is_chapter and current:
                 section = "\n\n".join(current).strip()
@@ -103,18 +111,36 @@ class PdfParser(BaseParser):
     def _merge_short_pages(self, pages: list[str]) -> list[str]:
         """Fusiona páginas muy cortas con la siguiente para evitar chunks demasiado pequeños."""
         sections: list[str] = []
-        buffer = ""
+        # Páginas acumuladas y sus palabras: se unen una sola vez al emitir
+        # la sección, en vez de reconstruir el buffer en cada página.
+        buf_parts: list[str] = []
+        buf_words = 0
 
         for page in pages:
-            buffer = (buffer + "\n\n" + page).strip() if buffer else page
-            if len(buffer.split()) >= _MIN_SECTION_WORDS:
-                sections.append(buffer)
-                buffer = ""
-
-        if buffer:
+            buf_parts.append(page)
+            buf_words += len(page.split())
+            if buf_words >= _MIN_SECTION_WORDS:
+                sections.append(_join_pages(buf_parts))
+                buf_parts = []
+                buf_words = 0
+
+        if buf_parts:
+            buffer = _join_pages(buf_parts)
             if sections:
                 sections[-1] += "\n\n" + buffer
             else:
                 sections.append(buffer)
 
         return sections if sections else pages
+
+
+def _join_pages(parts: list[str]) -> str:
+    """
+    Una sola página se devuelve tal cual. Varias se unen con el mismo
+    resultado que el antiguo `(buffer + "\n\n" + page).strip()` página a
+    página: se recorta el final de cada página añadida tras la primera.
+    """
+    if len(parts) == 1:
+        return parts[0]
+    tail = "\n\n".join(part.rstrip() for part in parts[1:])
+    return (parts[0] + "\n\n" + tail).strip()
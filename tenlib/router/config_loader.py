@@ -1,5 +1,6 @@
 # router/config_loader.py
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -24,11 +25,11 @@ def load_model_configs(config_path: Optional[str] = None) -> list[ModelConfig]:
             f"Copia config.example.yaml a ~/.tenlib/config.yaml"
         )
 
-    with path.open(encoding="utf-8") as f:
-        raw = yaml.safe_load(f)
+    stat    = path.stat()
+    entries = _read_model_entries(str(path), stat.st_mtime_ns, stat.st_size)
 
     configs = []
-    for entry in raw.get("models", []):
+    for entry in entries:
         api_key = _resolve_env(entry.get("api_key"))
         configs.append(ModelConfig(
             name              = entry["name"],
@@ -42,6 +43,18 @@ def load_model_configs(config_path: Optional[str] = None) -> list[ModelConfig]:
     return sorted(configs, key=lambda c: c.priority)
 
 
+@lru_cache(maxsize=4)
+def _read_model_entries(path: str, mtime_ns: int, size: int) -> tuple[dict, ...]:
+    """
+    Parsea el YAML una sola vez por versión del archivo: mtime y tamaño son
+    parte de la clave, así que editar el config invalida la caché.
+    Las api_key se resuelven fuera, porque el entorno sí puede cambiar.
+    """
+    with open(path, encoding="utf-8") as f:
+        raw = yaml.safe_load(f)
+    return tuple(raw.get("models", []))
+
+
 def _resolve_env(value: Optional[str]) -> Optional[str]:
     """Expande ${VAR_NAME} desde el entorno."""
     if not value or not value.startswith("${"):
@@ -34,15 +34,38 @@ CREATE TABLE IF NOT EXISTS chunks (
     UNIQUE (book_id, chunk_index)
 );
 
+-- Texto original de referencia de cada chunk en modo fix (en chunks.original
+-- va la traducción a corregir). Permite reanudar sin volver a parsear.
+CREATE TABLE IF NOT EXISTS fix_sources (
+    book_id     INTEGER NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    original    TEXT    NOT NULL,
+    PRIMARY KEY (book_id, chunk_index),
+    FOREIGN KEY (book_id) REFERENCES books(id)
+);
+
 CREATE TABLE IF NOT EXISTS bible (
     id           INTEGER PRIMARY KEY AUTOINCREMENT,
     book_id      INTEGER NOT NULL,
     version      INTEGER NOT NULL DEFAULT 1,
-    content_json TEXT    NOT NULL,
+    content_json BLOB    NOT NULL,   -- JSON compacto UTF-8 (filas antiguas: TEXT)
     updated_at   TEXT    NOT NULL,
     FOREIGN KEY (book_id) REFERENCES books(id)
 );
 
+CREATE TABLE IF NOT EXISTS extract_cache (
+    key         TEXT    PRIMARY KEY,
+    update_json TEXT    NOT NULL,
+    created_at  TEXT    NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path        TEXT    PRIMARY KEY,
+    mtime_ns    INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    file_hash   TEXT    NOT NULL
+);
+
 CREATE TABLE IF NOT EXISTS quota_usage (
     model       TEXT    NOT NULL,
     date        TEXT    NOT NULL,
@@ -52,18 +75,19 @@ CREATE TABLE IF NOT EXISTS quota_usage (
 """
 
 
-def get_connection(db_path: str | None = None) -> sqlite3.Connection:
+def get_connection(db_path: str | None = None, threaded: bool = False) -> sqlite3.Connection:
     """
     Abre y configura la conexión a SQLite.
     Siempre devuelve rows como dicts (row_factory).
     Activa foreign keys — SQLite las tiene desactivadas por defecto.
+    threaded=True permite usarla desde otros hilos; el llamador serializa el acceso.
     """
     path = db_path or os.environ.get("TENLIB_DB_PATH") or str(_DEFAULT_DB_PATH)
 
     if path != ":memory:":
         Path(path).parent.mkdir(parents=True, exist_ok=True)
 
-    conn = sqlite3.connect(path)
+    conn = sqlite3.connect(path, check_same_thread=not threaded)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
     conn.execute("PRAGMA journal_mode = WAL")   # mejor performance en lecturas concurrentes
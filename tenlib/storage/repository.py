@@ -1,10 +1,13 @@
 # storage/repository.py
+import contextlib
+import functools
 import json
 import logging
 import sqlite3
+import threading
 from datetime import date, datetime, timezone
 from numbers import Integral
-from typing import Optional
+from typing import TYPE_CHECKING, Iterator, Optional
 
 from tenlib.storage.db import get_connection, init_schema
 from tenlib.storage.models import (
@@ -12,23 +15,54 @@ from tenlib.storage.models import (
     StoredBook, StoredChunk,
 )
 
+if TYPE_CHECKING:
+    from tenlib.context.bible import BookBible
+
 logger = logging.getLogger(__name__)
 
+# Cada cuántos chunks procesados se confirma el lote (chunks + Bible)
+_CHUNK_BATCH_SIZE = 10
+
+_UPDATE_TRANSLATION_SQL = """
+    UPDATE chunks
+    SET translated = ?, model_used = ?, confidence = ?, status = ?
+    WHERE id = ?
+"""
+_FLAG_CHUNK_SQL = "UPDATE chunks SET flags = ?, status = ? WHERE id = ?"
+
+
+def _synchronized(method):
+    """
+    Ejecuta el método con el lock del repositorio: en modo threaded la
+    conexión se comparte con los hilos de traducción (quota), y sqlite3
+    no aísla las transacciones de dos hilos sobre la misma conexión.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class Repository:
     """
     Única interfaz entre el resto de la aplicación y SQLite.
     Recibe un db_path para facilitar el testing con :memory:.
+    Con threaded=True es seguro llamarlo desde varios hilos: cada operación
+    toma `_lock`. Sin él, el lock no hace nada y la conexión queda atada
+    al hilo que la creó.
     """
 
-    def __init__(self, db_path: str | None = None):
-        self._conn = get_connection(db_path)
+    def __init__(self, db_path: str | None = None, threaded: bool = False):
+        self._conn = get_connection(db_path, threaded=threaded)
+        self._lock = threading.RLock() if threaded else contextlib.nullcontext()
         init_schema(self._conn)
 
     # ------------------------------------------------------------------
     # Books
     # ------------------------------------------------------------------
 
+    @_synchronized
     def create_book(
         self,
         title:       str,
@@ -53,18 +87,21 @@ class Repository:
             )
         return cursor.lastrowid  # type: ignore[return-value]
 
+    @_synchronized
     def get_book_by_hash(self, file_hash: str) -> StoredBook | None:
         row = self._conn.execute(
             "SELECT * FROM books WHERE file_hash = ?", (file_hash,)
         ).fetchone()
         return self._row_to_book(row) if row else None
 
+    @_synchronized
     def get_book_by_id(self, book_id: int) -> StoredBook | None:
         row = self._conn.execute(
             "SELECT * FROM books WHERE id = ?", (book_id,)
         ).fetchone()
         return self._row_to_book(row) if row else None
 
+    @_synchronized
     def update_book_status(self, book_id: int, status: BookStatus) -> None:
         with self._conn:
             self._conn.execute(
@@ -76,6 +113,7 @@ class Repository:
     # Chunks
     # ------------------------------------------------------------------
 
+    @_synchronized
     def save_chunks(self, book_id: int, chunks: list) -> None:
         """
         Bulk insert de chunks. Usa INSERT OR IGNORE para ser idempotente:
@@ -110,6 +148,7 @@ class Repository:
                 rows,
             )
 
+    @_synchronized
     def get_pending_chunks(self, book_id: int) -> list[StoredChunk]:
         rows = self._conn.execute(
             """
@@ -121,6 +160,45 @@ class Repository:
         ).fetchall()
         return [self._row_to_chunk(r) for r in rows]
 
+    def iter_pending_chunks(
+        self,
+        book_id:    int,
+        batch_size: int = 64,
+    ) -> Iterator[StoredChunk]:
+        """
+        Igual que get_pending_chunks pero perezoso: pagina por chunk_index
+        (keyset) y solo mantiene en memoria `batch_size` filas a la vez.
+        Los chunks que el llamador marca mientras itera no afectan a la
+        paginación porque la siguiente página parte del último índice visto.
+        """
+        last_index = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    """
+                    SELECT * FROM chunks
+                    WHERE book_id = ? AND status = ? AND chunk_index > ?
+                    ORDER BY chunk_index ASC
+                    LIMIT ?
+                    """,
+                    (book_id, ChunkStatus.PENDING.value, last_index, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for r in rows:
+                yield self._row_to_chunk(r)
+            last_index = rows[-1]["chunk_index"]
+
+    @_synchronized
+    def count_pending_chunks(self, book_id: int) -> int:
+        """Chunks pendientes del libro sin traer las filas."""
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM chunks WHERE book_id = ? AND status = ?",
+            (book_id, ChunkStatus.PENDING.value),
+        ).fetchone()
+        return row[0]
+
+    @_synchronized
     def get_all_chunks(self, book_id: int) -> list[StoredChunk]:
         rows = self._conn.execute(
             "SELECT * FROM chunks WHERE book_id = ? ORDER BY chunk_index ASC",
@@ -128,6 +206,36 @@ class Repository:
         ).fetchall()
         return [self._row_to_chunk(r) for r in rows]
 
+    @_synchronized
+    def save_source_chunks(self, book_id: int, sources: dict[int, str]) -> None:
+        """Guarda el original de referencia de cada chunk (modo fix)."""
+        with self._conn:
+            self._conn.executemany(
+                """
+                INSERT OR IGNORE INTO fix_sources (book_id, chunk_index, original)
+                VALUES (?, ?, ?)
+                """,
+                [(book_id, index, original) for index, original in sources.items()],
+            )
+
+    @_synchronized
+    def get_source_chunks_by_index(self, book_id: int) -> dict[int, str]:
+        """chunk_index → original de referencia. Vacío si no se guardó."""
+        rows = self._conn.execute(
+            "SELECT chunk_index, original FROM fix_sources WHERE book_id = ?",
+            (book_id,),
+        ).fetchall()
+        return {row["chunk_index"]: row["original"] for row in rows}
+
+    @_synchronized
+    def count_chunks(self, book_id: int) -> int:
+        """Total de chunks del libro sin traer las filas (ni su texto)."""
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM chunks WHERE book_id = ?", (book_id,)
+        ).fetchone()
+        return row[0]
+
+    @_synchronized
     def update_chunk_translation(
         self,
         chunk_id:   int,
@@ -142,26 +250,37 @@ class Repository:
         """
         with self._conn:
             self._conn.execute(
-                """
-                UPDATE chunks
-                SET translated = ?, model_used = ?, confidence = ?, status = ?
-                WHERE id = ?
-                """,
+                _UPDATE_TRANSLATION_SQL,
                 (translated, model_used, confidence, status.value, chunk_id),
             )
 
+    @_synchronized
     def flag_chunk(self, chunk_id: int, flags: list[str]) -> None:
         """Marca un chunk con flags y lo pone en FLAGGED."""
         with self._conn:
             self._conn.execute(
-                "UPDATE chunks SET flags = ?, status = ? WHERE id = ?",
+                _FLAG_CHUNK_SQL,
                 (json.dumps(flags), ChunkStatus.FLAGGED.value, chunk_id),
             )
 
+    def chunk_batch(
+        self,
+        book_id: int,
+        bible:   "BookBible",
+        every:   int = _CHUNK_BATCH_SIZE,
+    ) -> "ChunkWriteBatch":
+        """
+        Lote de update_chunk_translation/flag_chunk que se confirma, junto
+        con la Bible si cambió, en una sola transacción cada `every` chunks
+        y al salir del bloque `with`.
+        """
+        return ChunkWriteBatch(self._conn, self._lock, book_id, bible, every)
+
     # ------------------------------------------------------------------
     # Quota
     # ------------------------------------------------------------------
 
+    @_synchronized
     def add_token_usage(self, model: str, tokens: int) -> None:
         """
         Upsert: si ya existe el registro de hoy lo incrementa,
@@ -179,6 +298,7 @@ class Repository:
                 (model, today, tokens),
             )
 
+    @_synchronized
     def get_token_usage_today(self, model: str) -> int:
         today = date.today().isoformat()
         row = self._conn.execute(
@@ -188,37 +308,71 @@ class Repository:
         return row["tokens_used"] if row else 0
 
     # ------------------------------------------------------------------
-    # Bible
+    # Caché del extractor
     # ------------------------------------------------------------------
 
-    def save_bible(self, book_id: int, bible: "BookBible") -> int:
+    @_synchronized
+    def get_extract_cache(self, key: str) -> Optional[str]:
+        """BibleUpdate serializado para esa clave, o None si no está."""
+        row = self._conn.execute(
+            "SELECT update_json FROM extract_cache WHERE key = ?", (key,)
+        ).fetchone()
+        return row["update_json"] if row else None
+
+    @_synchronized
+    def save_extract_cache(self, key: str, update_json: str) -> None:
+        created_at = datetime.now(timezone.utc).isoformat()
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO extract_cache (key, update_json, created_at)
+                VALUES (?, ?, ?)
+                """,
+                (key, update_json, created_at),
+            )
+
+    # ------------------------------------------------------------------
+    # Hashes de archivos
+    # ------------------------------------------------------------------
+
+    @_synchronized
+    def get_file_hash(self, path: str, mtime_ns: int, size: int) -> Optional[str]:
         """
-        Guarda una nueva versión de la Bible.
-        Siempre inserta una fila nueva (versionado inmutable).
-        Retorna el número de versión asignado.
+        Hash guardado para esa ruta si el archivo no cambió desde entonces
+        (mismo mtime y tamaño), o None.
         """
-        from datetime import datetime, timezone
-        updated_at = datetime.now(timezone.utc).isoformat()
-
-        # Obtener versión actual para incrementar
         row = self._conn.execute(
-            "SELECT MAX(version) as max_v FROM bible WHERE book_id = ?",
-            (book_id,),
+            "SELECT file_hash FROM file_hashes WHERE path = ? AND mtime_ns = ? AND size = ?",
+            (path, mtime_ns, size),
         ).fetchone()
+        return row["file_hash"] if row else None
 
-        next_version = (row["max_v"] or 0) + 1
-
+    @_synchronized
+    def save_file_hash(self, path: str, mtime_ns: int, size: int, file_hash: str) -> None:
         with self._conn:
             self._conn.execute(
                 """
-                INSERT INTO bible (book_id, version, content_json, updated_at)
+                INSERT OR REPLACE INTO file_hashes (path, mtime_ns, size, file_hash)
                 VALUES (?, ?, ?, ?)
                 """,
-                (book_id, next_version, bible.to_json(), updated_at),
+                (path, mtime_ns, size, file_hash),
             )
 
-        return next_version
+    # ------------------------------------------------------------------
+    # Bible
+    # ------------------------------------------------------------------
 
+    @_synchronized
+    def save_bible(self, book_id: int, bible: "BookBible") -> int:
+        """
+        Guarda una nueva versión de la Bible.
+        Siempre inserta una fila nueva (versionado inmutable).
+        Retorna el número de versión asignado.
+        """
+        with self._conn:
+            return _insert_bible_version(self._conn, book_id, bible)
+
+    @_synchronized
     def get_latest_bible(self, book_id: int) -> Optional["BookBible"]:
         """
         Carga la versión más reciente de la Bible para un libro.
@@ -240,7 +394,7 @@ class Repository:
             return None
 
         try:
-            return BookBible.from_json(row["content_json"])
+            return BookBible.from_blob(row["content_json"])
         except Exception as e:
             logger.warning("Error deserializando Bible del libro %d: %s", book_id, e)
             return None
@@ -282,5 +436,125 @@ class Repository:
     # Cleanup (para tests)
     # ------------------------------------------------------------------
 
+    @_synchronized
     def close(self) -> None:
         self._conn.close()
+
+
+def _insert_bible_version(
+    conn:    sqlite3.Connection,
+    book_id: int,
+    bible:   "BookBible",
+) -> int:
+    """
+    Inserta la siguiente versión de la Bible sin confirmar: quien llama
+    abre la transacción. Retorna el número de versión asignado.
+    """
+    updated_at = datetime.now(timezone.utc).isoformat()
+
+    # Obtener versión actual para incrementar
+    row = conn.execute(
+        "SELECT MAX(version) as max_v FROM bible WHERE book_id = ?",
+        (book_id,),
+    ).fetchone()
+
+    next_version = (row["max_v"] or 0) + 1
+
+    conn.execute(
+        """
+        INSERT INTO bible (book_id, version, content_json, updated_at)
+        VALUES (?, ?, ?, ?)
+        """,
+        (book_id, next_version, bible.to_blob(), updated_at),
+    )
+    return next_version
+
+
+class ChunkWriteBatch:
+    """
+    Acumula las escrituras de chunks del bucle de traducción y las confirma
+    con executemany en una transacción, en vez de una por chunk. La Bible
+    se guarda en esa misma transacción si cambió desde el último lote, así
+    los chunks confirmados y la Bible nunca se desincronizan.
+
+    El lote lleno se confirma al llegar la escritura siguiente, no antes:
+    así la Bible que aprendió del último chunk entra en su misma transacción.
+    Durabilidad: un kill duro entre dos confirmaciones pierde como mucho
+    `every` chunks (que vuelven a quedar pendientes) y la Bible que aprendió
+    de ellos. Al salir del bloque `with` (fin normal, pausa por quota,
+    excepción) confirma lo que quede pendiente.
+    """
+
+    def __init__(
+        self,
+        conn:    sqlite3.Connection,
+        lock:    threading.RLock,
+        book_id: int,
+        bible:   "BookBible",
+        every:   int = _CHUNK_BATCH_SIZE,
+    ):
+        self._conn         = conn
+        self._lock         = lock
+        self._book_id      = book_id
+        self._bible        = bible
+        self._every        = max(every, 1)
+        self._translations: list[tuple] = []
+        self._flags:        list[tuple] = []
+        self._bible_dirty  = False
+        self._pending      = 0
+
+    def __enter__(self) -> "ChunkWriteBatch":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+    def update_chunk_translation(
+        self,
+        chunk_id:   int,
+        translated: str,
+        model_used: str,
+        confidence: float,
+        status:     ChunkStatus = ChunkStatus.DONE,
+    ) -> None:
+        self._reserve()
+        self._translations.append(
+            (translated, model_used, confidence, status.value, chunk_id)
+        )
+
+    def flag_chunk(self, chunk_id: int, flags: list[str]) -> None:
+        self._reserve()
+        self._flags.append(
+            (json.dumps(flags), ChunkStatus.FLAGGED.value, chunk_id)
+        )
+
+    def mark_bible_dirty(self) -> None:
+        """La Bible cambió: se guardará con el próximo lote de chunks."""
+        self._bible_dirty = True
+
+    def flush(self) -> None:
+        """
+        Confirma el lote. Las traducciones van antes que los flags: un chunk
+        que falló después de guardarse queda FLAGGED, igual que sin lote.
+        """
+        if not self._pending and not self._bible_dirty:
+            return
+        with self._lock, self._conn:
+            if self._translations:
+                self._conn.executemany(_UPDATE_TRANSLATION_SQL, self._translations)
+            if self._flags:
+                self._conn.executemany(_FLAG_CHUNK_SQL, self._flags)
+            version = None
+            if self._bible_dirty:
+                version = _insert_bible_version(self._conn, self._book_id, self._bible)
+        if version is not None:
+            logger.debug("Bible actualizada a versión %d", version)
+        self._translations.clear()
+        self._flags.clear()
+        self._bible_dirty = False
+        self._pending     = 0
+
+    def _reserve(self) -> None:
+        if self._pending >= self._every:
+            self.flush()
+        self._pending += 1
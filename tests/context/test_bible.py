@@ -75,12 +75,68 @@ class TestBookBible:
         ]))
         assert len(bible.decisions) == 1
 
+    def test_apply_dedup_decisions_largas(self):
+        base = (
+            "Se mantiene el usted entre los nobles y el tuteo entre los soldados "
+            "de la guardia del castillo, respetando la jerarquía original y los "
+            "honoríficos solo cuando aportan matiz cultural al lector hispano."
+        )
+        bible = BookBible.empty()
+        bible.apply(BibleUpdate(decisions=[base]))
+        bible.apply(BibleUpdate(decisions=[base.replace("nobles", "nobleza")]))
+        assert len(bible.decisions) == 1
+
+    def test_apply_dedup_decisions_sin_rapidfuzz(self, monkeypatch):
+        import context.bible as bible_module
+        monkeypatch.setattr(bible_module, "process", None)
+        bible = BookBible.empty()
+        bible.apply(BibleUpdate(decisions=["Se mejoró la fluidez general."]))
+        bible.apply(BibleUpdate(decisions=["Se mejoro la fluidez general"]))
+        bible.apply(BibleUpdate(decisions=["Tutear siempre al lector."]))
+        assert len(bible.decisions) == 2
+
     def test_apply_limita_decisions_para_controlar_tokens(self):
         bible = BookBible.empty()
         for i in range(30):
             bible.apply(BibleUpdate(decisions=[f"decisión {i}"]))
         assert len(bible.decisions) <= 18
 
+    def test_apply_respeta_limite_de_glosario(self):
+        bible = BookBible.empty()
+        bible.apply(BibleUpdate(glossary={f"term{i}": "x" for i in range(598)}))
+        bible.apply(BibleUpdate(glossary={"a": "1", "term0": "otro", "b": "2", "c": "3"}))
+        assert len(bible.glossary) == 600
+        assert "c" not in bible.glossary
+        assert bible.glossary["term0"] == "x"
+
+    def test_apply_lleno_de_personajes_aun_enriquece_genericos(self):
+        generic = "personaje mencionado en esta escena"
+        names = [f"Nombre{chr(65 + i // 26)}{chr(97 + i % 26)}" for i in range(240)]
+        bible = BookBible.empty()
+        bible.apply(BibleUpdate(characters={name: generic for name in names}))
+        bible.apply(BibleUpdate(characters={"Kvothe": "nuevo", names[0]: "arcanista"}))
+        assert len(bible.characters) == 240
+        assert "Kvothe" not in bible.characters
+        assert bible.characters[names[0]] == "arcanista"
+
+    def test_character_name_index_se_invalida_en_apply(self):
+        bible = BookBible.empty()
+        bible.apply(BibleUpdate(characters={"Ángel": "x"}))
+        assert bible.character_name_index() == {"angel": "Ángel"}
+
+        bible.apply(BibleUpdate(characters={"Denna": "y"}, rejected=["Ángel"]))
+        assert bible.character_name_index() == {"denna": "Denna"}
+
+    def test_character_name_index_ve_cambios_directos(self):
+        bible = BookBible.empty()
+        assert bible.character_name_index() == {}
+
+        bible.characters["Denna"] = "cantante"
+        assert bible.character_name_index() == {"denna": "Denna"}
+
+        del bible.characters["Denna"]
+        assert bible.character_name_index() == {}
+
     def test_apply_recorta_last_scene_muy_largo(self):
         bible = BookBible.empty()
         bible.apply(BibleUpdate(last_scene="x" * 1000))
@@ -101,6 +157,46 @@ class TestBookBible:
         assert restored.decisions        == bible.decisions
         assert restored.last_scene       == bible.last_scene
 
+    def test_json_size_coincide_con_to_json(self):
+        bible = BookBible(
+            voice      = "tercera persona",
+            decisions  = ["tutear al lector", "comillas «»"],
+            glossary   = {"Kvothe": "Kvothe", "Sympathy": "Simpatía"},
+            characters = {"Kvothe": "habla \"directo\""},
+            last_scene = "Llegó a la Universidad",
+        )
+        assert bible.json_size() == len(bible.to_json())
+        assert bible.json_size(pretty=True) == len(bible.to_json(pretty=True))
+
+    def test_to_json_compacto_por_defecto(self):
+        bible = BookBible(glossary={"Kvothe": "Kvothe"})
+        assert "\n" not in bible.to_json()
+        assert "\n" in bible.to_json(pretty=True)
+        assert BookBible.from_json(bible.to_json(pretty=True)) == bible
+
+    def test_to_json_igual_sin_orjson(self, monkeypatch):
+        import context.bible as bible_module
+        bible = BookBible(
+            voice      = "tercera persona",
+            decisions  = ["comillas «»"],
+            glossary   = {"Sympathy": "Simpatía"},
+            characters = {"Kvothe": "habla \"directo\""},
+            last_scene = "Llegó a la Universidad",
+        )
+        raw    = bible.to_json()
+        pretty = bible.to_json(pretty=True)
+
+        monkeypatch.setattr(bible_module, "orjson", None)
+        assert bible.to_json() == raw
+        assert bible.to_json(pretty=True) == pretty
+        assert bible.json_size() == len(raw)
+        assert BookBible.from_json(raw) == bible
+
+    def test_to_blob_cae_a_la_stdlib_si_orjson_no_puede(self):
+        # orjson rechaza claves no-str; to_json() y to_blob() las aceptan igual
+        bible = BookBible(glossary={1: "uno"})
+        assert bible.to_blob() == bible.to_json().encode("utf-8")
+
     # ── Actualización de descripciones genéricas ──────────────────────────
 
     def test_apply_actualiza_descripcion_generica_con_info_real(self):
@@ -1,4 +1,10 @@
-from tenlib.context.character_detector import extract_character_mentions
+import pickle
+
+from tenlib.context.character_detector import (
+    collect_character_candidates,
+    extract_character_mentions,
+    rank_character_candidates,
+)
 
 
 class TestCharacterDetector:
@@ -155,3 +161,37 @@ class TestCharacterDetector:
 
         # Organización (solo aparece tras "de") → NO debe detectarse
         assert "Tempest" not in result
+
+    # ── Detección en dos fases (collect → rank) ───────────────────────────
+
+    def test_collect_y_rank_equivalen_a_extract(self):
+        existing = {"Luminas": "líder reservada"}
+        text = (
+            "Nadie podía competir con Luminas. "
+            "Rimuru avanzó. Benimaru respondió. Shion gritó."
+        )
+        candidates = collect_character_candidates("", text)
+        ranked = rank_character_candidates(
+            candidates, max_characters=3, existing_characters=existing,
+        )
+        assert ranked == extract_character_mentions(
+            "", text, max_characters=3, existing_characters=existing,
+        )
+
+    def test_candidatos_son_serializables_para_procesos(self):
+        candidates = collect_character_candidates("", "Rimuru avanzó. Rimuru dijo algo.")
+        restored = pickle.loads(pickle.dumps(candidates))
+        assert rank_character_candidates(restored) == rank_character_candidates(candidates)
+
+    def test_texto_sin_nombres_capitalizados_no_tiene_candidatos(self):
+        candidates = collect_character_candidates("", "—sí, dijo él. ¿y ahora qué?")
+        assert candidates.stats_by_norm == {}
+        assert extract_character_mentions("", "—sí, dijo él.") == {}
+
+    def test_indice_de_conocidos_equivale_a_existing_characters(self):
+        existing = {"Ángel": "protagonista"}
+        text = "Angel miró el mapa. angel dijo algo."
+        index = {"angel": "Ángel"}
+        assert extract_character_mentions(
+            "", text, existing_characters_index=index,
+        ) == extract_character_mentions("", text, existing_characters=existing)
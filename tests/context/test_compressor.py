@@ -89,3 +89,21 @@ class TestBibleCompressor:
         ratio      = self.compressor.compression_ratio(self.bible, compressed)
         assert ratio < 1.0
 
+    def test_detecta_cambios_en_la_bible_entre_llamadas(self):
+        self.compressor.compress(self.bible, "Kvothe caminó.")
+        self.bible.characters.pop("Chronicler")
+        self.bible.characters["Denna"] = "misteriosa"
+
+        result = self.compressor.compress(self.bible, "Denna y Kvothe.")
+        assert set(result.characters) == {"Kvothe", "Denna"}
+
+    def test_sin_ahocorasick_mismo_resultado(self, monkeypatch):
+        import tenlib.context.compressor as compressor_module
+        chunk    = "KVOTHE practicó sympathy."
+        expected = self.compressor.compress(self.bible, chunk)
+
+        monkeypatch.setattr(compressor_module, "ahocorasick", None)
+        result = BibleCompressor().compress(self.bible, chunk)
+
+        assert result.glossary   == expected.glossary
+        assert result.characters == expected.characters
@@ -53,6 +53,12 @@ class TestBibleExtractor:
         assert result is not None
         assert result.glossary["Chandrian"] == "Chandrian"
 
+    def test_palabras_clave_de_notas_ignoran_mayusculas(self):
+        extractor = BibleExtractor(make_model("{}"), extract_every_n=10)
+        assert extractor.should_extract(2, "NUEVO TÉRMINO: Chandrian")
+        assert extractor.should_extract(2, "Decisión de estilo")
+        assert not extractor.should_extract(2, "sin novedades")
+
     def test_extrae_cada_n_chunks(self):
         model     = make_model('{"glossary": {}, "characters": {}, "decisions": [], "last_scene": "s"}')
         extractor = BibleExtractor(model, extract_every_n=3)
@@ -95,7 +101,7 @@ class TestBibleExtractor:
     def test_parsea_json_anidado_en_bloque_markdown(self):
         """
         El JSON del extractor tiene objetos anidados (glossary, characters).
-        El regex greedy debe capturar el JSON completo sin truncarlo.
+        El escaneo de llaves debe capturar el JSON completo sin truncarlo.
         """
         json_in_md = (
             "```json\n"
@@ -114,6 +120,43 @@ class TestBibleExtractor:
         assert result.glossary["Sympathy"] == "Simpatía"
         assert result.characters["Kvothe"] == "protagonista"
 
+    def test_parsea_primer_objeto_con_texto_y_llaves_alrededor(self):
+        raw = (
+            'Aquí va {el resumen}:\n```json\n'
+            '{"glossary": {"Naming": "Nombrar"}, "characters": {}, '
+            '"decisions": ["usar \\"}\\" literal"], "last_scene": "s"}\n'
+            '```\nNota final {sin json}'
+        )
+        extractor = BibleExtractor(make_model(raw))
+
+        result = extractor.extract("o", "t", "nuevo: Naming", chunk_index=0)
+
+        assert result.glossary == {"Naming": "Nombrar"}
+        assert result.decisions == ['usar "}" literal']
+
+    def test_normaliza_campos_con_tipos_inesperados(self):
+        json_resp = (
+            '{"glossary": {"Naming": 1, "Vacío": "", "Sympathy": "Simpatía"}, '
+            '"decisions": ["tutear", "", 3], "last_scene": "s"}'
+        )
+        extractor = BibleExtractor(make_model(json_resp))
+
+        result = extractor.extract("o", "t", "ok", chunk_index=0)
+
+        assert result.glossary == {"Naming": "1", "Sympathy": "Simpatía"}
+        assert result.decisions == ["tutear", "3"]
+
+    def test_parsea_json_sin_orjson(self, monkeypatch):
+        import json
+        import tenlib.context.extractor as extractor_module
+        monkeypatch.setattr(extractor_module, "_json_loads", json.loads)
+        model     = make_model('```json\n{"glossary": {"Naming": "Nombrar"}, "last_scene": "s"}\n```')
+        extractor = BibleExtractor(model)
+
+        result = extractor.extract("o", "t", "nuevo: Naming", chunk_index=0)
+
+        assert result.glossary == {"Naming": "Nombrar"}
+
     # ── Validación de candidatos ──────────────────────────────────────────
 
     def test_incluye_candidatos_en_prompt_cuando_se_proveen(self):
@@ -136,6 +179,37 @@ class TestBibleExtractor:
         assert "Rimuru" in prompt_usado
         assert "Tempest" in prompt_usado
 
+    def test_instrucciones_fijas_van_como_prefijo_cacheable(self):
+        """
+        Las instrucciones son el system prompt, idéntico entre chunks;
+        el texto variable solo aparece en el mensaje.
+        """
+        model     = make_model('{"glossary": {}, "characters": {}, "decisions": [], "last_scene": "s"}')
+        extractor = BibleExtractor(model, extract_every_n=1)
+
+        extractor.extract("Kvothe habló.", "Kvothe spoke.", "ok", chunk_index=1)
+        extractor.extract("Denna rió.", "Denna laughed.", "ok", chunk_index=2,
+                          character_candidates={"Denna": "x"})
+
+        first, second = model.translate.call_args_list
+        assert first.kwargs["system_prompt"] == second.kwargs["system_prompt"]
+        assert "Kvothe" not in first.kwargs["system_prompt"]
+        assert "Kvothe habló." in first.args[0]
+
+    def test_candidatos_en_orden_estable(self):
+        json_resp = '{"glossary": {}, "characters": {}, "decisions": [], "last_scene": "s"}'
+        model_a   = make_model(json_resp)
+        model_b   = make_model(json_resp)
+
+        BibleExtractor(model_a).extract(
+            "o", "t", "ok", chunk_index=0, character_candidates={"Rimuru": "x", "Benimaru": "x"},
+        )
+        BibleExtractor(model_b).extract(
+            "o", "t", "ok", chunk_index=0, character_candidates={"Benimaru": "x", "Rimuru": "x"},
+        )
+
+        assert model_a.translate.call_args.args[0] == model_b.translate.call_args.args[0]
+
     def test_sin_candidatos_no_incluye_seccion_candidatos(self):
         """
         Sin character_candidates, el prompt NO debe incluir la sección de candidatos.
@@ -215,3 +289,49 @@ class TestBibleExtractor:
         assert result is not None
         assert result.rejected == []
 
+    def test_canonicaliza_entradas_del_prompt(self):
+        """CRLF, espacios finales y líneas en blanco extra no cambian el prompt."""
+        json_resp = '{"glossary": {}, "characters": {}, "decisions": [], "last_scene": "s"}'
+        model_a   = make_model(json_resp)
+        model_b   = make_model(json_resp)
+
+        BibleExtractor(model_a, extract_every_n=1).extract(
+            "Café uno  \r\nlinea dos\r\n\r\n\r\nfin\n", "t", "ok", chunk_index=1
+        )
+        BibleExtractor(model_b, extract_every_n=1).extract(
+            "Café uno\nlinea dos\n\nfin", "t", "ok", chunk_index=2
+        )
+
+        assert model_a.translate.call_args.args[0] == model_b.translate.call_args.args[0]
+
+    def test_respuesta_repetida_sale_de_cache(self):
+        json_resp = '{"glossary": {"Naming": "Nombrar"}, "characters": {}, "decisions": [], "last_scene": "s"}'
+        model     = make_model(json_resp)
+        store     = MagicMock()
+        store.get_extract_cache.return_value = None
+        extractor = BibleExtractor(model, extract_every_n=1, cache_store=store)
+
+        first  = extractor.extract("original", "traducción", "ok", chunk_index=1)
+        first.glossary["mutado"] = "x"
+        second = extractor.extract("original", "traducción", "ok", chunk_index=2)
+
+        assert model.translate.call_count == 1
+        assert second.glossary == {"Naming": "Nombrar"}
+        store.save_extract_cache.assert_called_once()
+
+    def test_cache_persistente_evita_llamada_al_modelo(self):
+        model_a = make_model('{"glossary": {"Naming": "Nombrar"}, "characters": {}, "decisions": [], "last_scene": "s"}')
+        saved   = {}
+        store   = MagicMock()
+        store.get_extract_cache.side_effect  = saved.get
+        store.save_extract_cache.side_effect = saved.__setitem__
+
+        BibleExtractor(model_a, extract_every_n=1, cache_store=store).extract("o", "t", "ok", chunk_index=1)
+
+        model_b = make_model("no debería usarse")
+        result  = BibleExtractor(model_b, extract_every_n=1, cache_store=store).extract(
+            "o", "t", "ok", chunk_index=1
+        )
+
+        model_b.translate.assert_not_called()
+        assert result.glossary == {"Naming": "Nombrar"}
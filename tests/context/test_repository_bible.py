@@ -65,3 +65,22 @@ class TestRepositoryBible:
 
         assert repo.get_latest_bible(book_1).last_scene == "libro A"
         assert repo.get_latest_bible(book_2).last_scene == "libro B"
+
+    def test_lee_filas_antiguas_guardadas_como_texto(self, repo, book_id):
+        legacy = BookBible(glossary={"Sympathy": "Simpatía"}, last_scene="escena")
+        with repo._conn:
+            repo._conn.execute(
+                "INSERT INTO bible (book_id, version, content_json, updated_at) "
+                "VALUES (?, 1, ?, '2024-01-01T00:00:00+00:00')",
+                (book_id, legacy.to_json()),
+            )
+
+        recovered = repo.get_latest_bible(book_id)
+        assert recovered.glossary   == {"Sympathy": "Simpatía"}
+        assert recovered.last_scene == "escena"
+
+    def test_cache_del_extractor_round_trip(self, repo):
+        assert repo.get_extract_cache("k") is None
+        repo.save_extract_cache("k", '{"glossary": {}}')
+        repo.save_extract_cache("k", '{"glossary": {"a": "b"}}')
+        assert repo.get_extract_cache("k") == '{"glossary": {"a": "b"}}'
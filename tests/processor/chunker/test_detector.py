@@ -357,3 +357,49 @@ def test_texto_de_una_sola_linea_produce_un_segmento(detector):
     assert len(segments) == 1
     assert segments[0].text == text
     assert segments[0].original_position == 0
+
+
+# ---------------------------------------------------------------------------
+# Patrones unidos por categoría
+# ---------------------------------------------------------------------------
+
+
+def test_patrones_unidos_clasifican_igual_que_por_separado(config, estimator):
+    """La alternancia por categoría da el mismo límite que probar cada patrón."""
+    # Arrange
+    import re
+    detector = BoundaryDetector(config, estimator)
+    lines = [
+        "Capítulo 3", "CHAPTER IV", "第三章", "## Título", "PART 2", "XII.",
+        "***", "* * *", "···", "###", "*Kvothe*", "DENNA habla", "  sangría",
+        "\tTab", "Fin. Otra", "texto normal", "iv.",
+    ]
+    separate = {
+        BoundaryType.CHAPTER: [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in config.chapter_patterns],
+        BoundaryType.SCENE: [re.compile(p, re.MULTILINE) for p in config.scene_patterns],
+        BoundaryType.POV: [re.compile(p, re.MULTILINE) for p in config.pov_patterns],
+        BoundaryType.PARAGRAPH: [re.compile(p, re.MULTILINE) for p in config.paragraph_patterns],
+        BoundaryType.SENTENCE: [re.compile(p, re.MULTILINE) for p in config.sentence_patterns],
+    }
+
+    # Act / Assert
+    for line in lines:
+        expected = next(
+            (kind for kind, patterns in separate.items()
+             if any(p.match(line.strip()) for p in patterns)),
+            None,
+        )
+        assert detector._classify_line(line, [line], 0) == expected, line
+
+
+def test_patron_con_referencia_a_grupo_no_se_une(estimator):
+    """Un \\1 cambiaría de grupo al unir: esos patrones se compilan aparte."""
+    # Arrange
+    config = ChunkConfig(scene_patterns=[r'^(x)y$', r'^([*~])\1\1$'])
+
+    # Act
+    detector = BoundaryDetector(config, estimator)
+
+    # Assert
+    assert len(detector._compiled[BoundaryType.SCENE]) == 2
+    assert detector._classify_line("~~~", ["~~~"], 0) == BoundaryType.SCENE
@@ -307,6 +307,52 @@ class TestEpubParser:
                 parser.parse(str(dummy_file))
 
 
+# ═══════════════════════════════════════════════════════════════════════════ #
+#  PdfParser (helpers de agrupado, sin pymupdf)                               #
+# ═══════════════════════════════════════════════════════════════════════════ #
+
+class TestPdfParser:
+
+    @pytest.fixture
+    def parser(self):
+        from tenlib.processor.parsers.pdf_parser import PdfParser
+        return PdfParser()
+
+    def test_merge_short_pages_acumula_hasta_minimo_de_palabras(self, parser):
+        pages = ["uno " * 15, "dos " * 30, "tres " * 45, "cuatro " * 5]
+        sections = parser._merge_short_pages([p.strip() for p in pages])
+        assert len(sections) == 2
+        assert sections[0].count("uno") == 15 and sections[0].count("dos") == 30
+        # La cola corta se pega a la última sección
+        assert sections[1].endswith("\n\n" + ("cuatro " * 5).strip())
+
+    def test_parse_descarta_paginas_casi_vacias(self, parser, monkeypatch):
+        import sys
+        texts = ["  Mi libro\n", "12\n13\n14\n15", "una dos tres\ncuatro cinco", "seis"]
+        pages = []
+        for text in texts:
+            page = MagicMock()
+            page.get_text.return_value = text
+            pages.append(page)
+        doc = MagicMock()
+        doc.__iter__.return_value = iter(pages)
+        fake_fitz = MagicMock()
+        fake_fitz.open.return_value = doc
+        monkeypatch.setitem(sys.modules, "fitz", fake_fitz)
+
+        book = parser.parse("libro.pdf")
+
+        assert book.sections == ["una dos tres\ncuatro cinco"]
+        doc.close.assert_called_once()
+
+    def test_split_by_chapters_corta_en_encabezados(self, parser):
+        pages = ["Prólogo\ntexto", "sigue", "Capítulo 1\nmás texto"]
+        assert parser._split_by_chapters(pages) == [
+            "Prólogo\ntexto\n\nsigue",
+            "Capítulo 1\nmás texto",
+        ]
+
+
 # ═══════════════════════════════════════════════════════════════════════════ #
 #  ParserFactory                                                              #
 # ═══════════════════════════════════════════════════════════════════════════ #
@@ -333,8 +379,9 @@ class TestParserFactory:
         from tenlib.processor.parsers.factory import UnsupportedFormatError
         f = tmp_path / "libro.docx"
         f.write_bytes(b"PK\x03\x04")  # cabecera ZIP (formato docx)
-        with pytest.raises(UnsupportedFormatError):
+        with pytest.raises(UnsupportedFormatError) as exc:
             factory.parse(str(f))
+        assert ".epub, .md, .pdf, .txt" in str(exc.value)
 
     def test_custom_parser_registered_first(self, factory, tmp_path):
         """Un parser registrado manualmente tiene prioridad sobre los defaults."""
@@ -350,6 +397,22 @@ class TestParserFactory:
         book = factory.parse(str(f))
         assert book.title == "fake"
 
+    def test_unsupported_format_lists_registered_parsers(self, factory, tmp_path):
+        from tenlib.processor.parsers.base import BaseParser
+        from tenlib.processor.parsers.factory import UnsupportedFormatError
+
+        class FakeParser(BaseParser):
+            _SUPPORTED_EXTENSIONS = {'.fake'}
+            def can_handle(self, path): return path.endswith('.fake')
+            def parse(self, path): return RawBook("fake", path, ["sección fake"])
+
+        factory.register(FakeParser())
+        f = tmp_path / "libro.docx"
+        f.write_bytes(b"PK\x03\x04")
+        with pytest.raises(UnsupportedFormatError) as exc:
+            factory.parse(str(f))
+        assert ".epub, .fake, .md, .pdf, .txt" in str(exc.value)
+
     def test_parse_file_classmethod(self, tmp_path):
         from tenlib.processor.parsers.factory import ParserFactory
         f = tmp_path / "libro.txt"
@@ -0,0 +1,37 @@
+# tests/router/test_config_loader.py
+import os
+
+from router.config_loader import load_model_configs
+
+_YAML = """\
+models:
+  - name: claude
+    priority: {priority}
+    api_key: ${{TEST_TENLIB_KEY}}
+"""
+
+
+class TestLoadModelConfigs:
+
+    def test_relee_el_yaml_si_cambia(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("TEST_TENLIB_KEY", "k1")
+        path = tmp_path / "config.yaml"
+        path.write_text(_YAML.format(priority=1), encoding="utf-8")
+
+        assert load_model_configs(str(path))[0].priority == 1
+
+        path.write_text(_YAML.format(priority=22), encoding="utf-8")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert load_model_configs(str(path))[0].priority == 22
+
+    def test_api_key_se_resuelve_en_cada_llamada(self, tmp_path, monkeypatch):
+        path = tmp_path / "config.yaml"
+        path.write_text(_YAML.format(priority=1), encoding="utf-8")
+
+        monkeypatch.setenv("TEST_TENLIB_KEY", "k1")
+        assert load_model_configs(str(path))[0].api_key == "k1"
+
+        monkeypatch.setenv("TEST_TENLIB_KEY", "k2")
+        assert load_model_configs(str(path))[0].api_key == "k2"
@@ -83,6 +83,20 @@ class TestChunks:
         stored = repo.get_all_chunks(sample_book_id)
         assert len(stored) == 5
 
+    def test_count_chunks(self, repo, sample_book_id):
+        assert repo.count_chunks(sample_book_id) == 0
+        repo.save_chunks(sample_book_id, make_mock_chunks(4))
+        assert repo.count_chunks(sample_book_id) == 4
+
+    def test_file_hash_solo_si_no_cambio(self, repo):
+        repo.save_file_hash("/libros/a.txt", 100, 50, "h1")
+        assert repo.get_file_hash("/libros/a.txt", 100, 50) == "h1"
+        assert repo.get_file_hash("/libros/a.txt", 101, 50) is None
+        assert repo.get_file_hash("/libros/a.txt", 100, 51) is None
+
+        repo.save_file_hash("/libros/a.txt", 101, 50, "h2")
+        assert repo.get_file_hash("/libros/a.txt", 101, 50) == "h2"
+
     def test_chunks_guardados_en_status_pending(self, repo, sample_book_id):
         repo.save_chunks(sample_book_id, make_mock_chunks(3))
         stored = repo.get_all_chunks(sample_book_id)
@@ -101,6 +115,76 @@ class TestChunks:
         pending = repo.get_pending_chunks(sample_book_id)
         assert len(pending) == 3
 
+    def test_iter_pending_pagina_aunque_cambie_el_status(self, repo, sample_book_id):
+        """El cursor perezoso recorre todo aunque se marquen chunks mientras itera."""
+        repo.save_chunks(sample_book_id, make_mock_chunks(7))
+        assert repo.count_pending_chunks(sample_book_id) == 7
+
+        seen = []
+        for chunk in repo.iter_pending_chunks(sample_book_id, batch_size=2):
+            seen.append(chunk.chunk_index)
+            repo.update_chunk_translation(chunk.id, "traducción", "claude", 0.95)
+
+        assert seen == list(range(7))
+        assert repo.count_pending_chunks(sample_book_id) == 0
+
+    def test_chunk_batch_confirma_cada_n_y_al_salir(self, repo, sample_book_id):
+        from tenlib.context.bible import BookBible
+        repo.save_chunks(sample_book_id, make_mock_chunks(5))
+        stored = repo.get_all_chunks(sample_book_id)
+
+        with repo.chunk_batch(sample_book_id, BookBible(), every=2) as batch:
+            batch.update_chunk_translation(stored[0].id, "uno", "claude", 0.9)
+            assert repo.count_pending_chunks(sample_book_id) == 5
+            batch.update_chunk_translation(stored[1].id, "dos", "claude", 0.9)
+            assert repo.count_pending_chunks(sample_book_id) == 5
+
+            # El lote lleno se confirma con la escritura siguiente
+            batch.update_chunk_translation(stored[2].id, "tres", "claude", 0.9)
+            assert repo.count_pending_chunks(sample_book_id) == 3
+
+            # Traducido y luego flaggeado en el mismo lote → queda FLAGGED
+            batch.flag_chunk(stored[2].id, ["error"])
+            batch.update_chunk_translation(stored[3].id, "cuatro", "claude", 0.9)
+
+        chunks = {c.id: c for c in repo.get_all_chunks(sample_book_id)}
+        assert chunks[stored[1].id].translated == "dos"
+        assert chunks[stored[2].id].status == ChunkStatus.FLAGGED
+        assert chunks[stored[2].id].translated == "tres"
+        assert chunks[stored[3].id].translated == "cuatro"
+        assert repo.count_pending_chunks(sample_book_id) == 1
+
+    def test_chunk_batch_confirma_bible_con_sus_chunks(self, repo, sample_book_id):
+        """Chunks y Bible se confirman juntos: sin commit no hay ni uno ni otro."""
+        from tenlib.context.bible import BookBible
+        repo.save_chunks(sample_book_id, make_mock_chunks(3))
+        stored = repo.get_all_chunks(sample_book_id)
+        bible  = BookBible(last_scene="escena")
+
+        batch = repo.chunk_batch(sample_book_id, bible, every=2)
+        batch.update_chunk_translation(stored[0].id, "uno", "claude", 0.9)
+        batch.mark_bible_dirty()
+
+        # Antes del límite del lote, un kill duro perdería chunk y Bible a la vez
+        assert repo.count_pending_chunks(sample_book_id) == 3
+        assert repo.get_latest_bible(sample_book_id) is None
+
+        batch.update_chunk_translation(stored[1].id, "dos", "claude", 0.9)
+        assert repo.count_pending_chunks(sample_book_id) == 3
+        assert repo.get_latest_bible(sample_book_id) is None
+
+        batch.update_chunk_translation(stored[2].id, "tres", "claude", 0.9)
+        assert repo.count_pending_chunks(sample_book_id) == 1
+        assert repo.get_latest_bible(sample_book_id).last_scene == "escena"
+
+        # Sin cambios en la Bible no se inserta otra versión
+        batch.flush()
+        assert repo.count_pending_chunks(sample_book_id) == 0
+        row = repo._conn.execute(
+            "SELECT COUNT(*) as c FROM bible WHERE book_id = ?", (sample_book_id,)
+        ).fetchone()
+        assert row["c"] == 1
+
     def test_save_chunks_es_idempotente(self, repo, sample_book_id):
         """Guardar los mismos chunks dos veces no duplica ni explota."""
         chunks = make_mock_chunks(5)
@@ -169,6 +253,16 @@ class TestQuota:
         repo.add_token_usage("claude", 200)
         assert repo.get_token_usage_today("claude") == 1700
 
+    def test_add_token_usage_desde_varios_hilos(self):
+        """Los adaptadores registran quota desde los hilos de traducción."""
+        from concurrent.futures import ThreadPoolExecutor
+        repo = Repository(":memory:", threaded=True)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            for _ in range(200):
+                pool.submit(repo.add_token_usage, "claude", 5)
+        assert repo.get_token_usage_today("claude") == 1000
+        repo.close()
+
     def test_quota_separada_por_modelo(self, repo):
         repo.add_token_usage("claude", 1000)
         repo.add_token_usage("gpt", 2000)
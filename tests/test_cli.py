@@ -89,6 +89,25 @@ class TestValidaciones:
         assert result.exit_code == 1
         assert "no encontrado" in result.output.lower()
 
+    def test_archivo_creado_tras_un_fallo_se_acepta(self, runner, tmp_path):
+        """Un primer intento fallido no debe recordarse entre invocaciones."""
+        f = tmp_path / "libro.txt"
+        assert run_translate(runner, f).exit_code == 1
+
+        f.write_text("Contenido de prueba para el libro.")
+        with patch("tenlib.cli.build_orchestrator") as mock_factory:
+            mock_factory.return_value.run.return_value = make_pipeline_result()
+            result = run_translate(runner, f)
+
+        assert result.exit_code == 0
+
+    def test_directorio_rechazado(self, runner, tmp_path):
+        d = tmp_path / "carpeta.txt"
+        d.mkdir()
+        result = run_translate(runner, d)
+        assert result.exit_code == 1
+        assert "no es un archivo" in result.output.lower()
+
     def test_formato_no_soportado(self, runner, tmp_path):
         f = tmp_path / "libro.docx"
         f.write_text("contenido")
@@ -113,6 +132,10 @@ class TestValidaciones:
         result = run_translate(runner, book_file, source="e$n", target="es")
         assert result.exit_code == 1
 
+    def test_lang_solo_guiones_rechazado(self, runner, book_file):
+        result = run_translate(runner, book_file, source="--", target="es")
+        assert result.exit_code == 1
+
     def test_formatos_soportados_aceptados(self, runner, tmp_path):
         """Los tres formatos del MVP pasan la validación de extensión."""
         for ext in [".txt", ".epub", ".md"]:
@@ -194,6 +217,21 @@ class TestFlujoFeliz:
             assert "pausado" in result.output.lower()
             assert "pendientes" in result.output.lower()
 
+    def test_max_in_flight_llega_al_orchestrator(self, runner, book_file):
+        with patch("tenlib.cli.build_orchestrator") as mock_factory:
+            mock_factory.return_value.run.return_value = make_pipeline_result()
+
+            result = runner.invoke(main, [
+                "translate",
+                "--book",          str(book_file),
+                "--from",          "en",
+                "--to",            "es",
+                "--max-in-flight", "4",
+            ])
+
+            assert result.exit_code == 0
+            mock_factory.assert_called_once_with(chunk_size="standard", max_in_flight=4)
+
     def test_lang_codes_se_normalizan_a_lowercase(self, runner, book_file):
         with patch("tenlib.cli.build_orchestrator") as mock_factory:
             mock_orch = MagicMock()
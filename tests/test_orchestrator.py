@@ -2,7 +2,7 @@
 import pytest
 from pathlib import Path
 from unittest.mock import MagicMock, patch, call
-from tenlib.orchestrator import Orchestrator, BookAlreadyDoneError
+from tenlib.orchestrator import Orchestrator, BookAlreadyDoneError, _ProgressSink
 from tenlib.reconstructor import Reconstructor
 from tenlib.storage.repository import Repository
 from tenlib.storage.models import BookMode, BookStatus, ChunkStatus, StoredBook, StoredChunk
@@ -245,6 +245,54 @@ class TestOrchestrator:
         with pytest.raises(FileNotFoundError):
             orch.run("/no/existe.txt", "en", "es")
 
+    def test_hash_del_libro_se_mantiene_sha256(self, tmp_path):
+        """El hash es la clave de reanudación: no puede cambiar entre versiones."""
+        import hashlib
+        from tenlib.orchestrator import _compute_hash
+        book = tmp_path / "libro.txt"
+        book.write_bytes(b"contenido " * 200_000)
+        assert _compute_hash(book) == hashlib.sha256(book.read_bytes()).hexdigest()
+
+    def test_hash_con_mmap_coincide_con_lectura_por_bloques(self, tmp_path, monkeypatch):
+        import hashlib
+        import tenlib.orchestrator as orch_module
+        book = tmp_path / "libro.txt"
+        book.write_bytes(b"contenido " * 200_000)
+        expected = hashlib.sha256(book.read_bytes()).hexdigest()
+
+        monkeypatch.setattr(orch_module, "_MMAP_HASH_MIN_SIZE", 1)
+        assert orch_module._compute_hash(book) == expected
+
+        # Un archivo vacío no se puede mapear: va por file_digest
+        empty = tmp_path / "vacio.txt"
+        empty.write_bytes(b"")
+        assert orch_module._compute_hash(empty) == hashlib.sha256(b"").hexdigest()
+
+    def test_hash_del_libro_se_memoiza_mientras_no_cambie(self, repo, tmp_path):
+        orch = make_orchestrator(repo, make_mock_router(), tmp_path)
+        book = tmp_path / "libro.txt"
+        book.write_text("uno", encoding="utf-8")
+
+        with patch("tenlib.orchestrator._compute_hash", return_value="h1") as compute:
+            assert orch._file_hash(book, book.stat()) == "h1"
+            assert orch._file_hash(book, book.stat()) == "h1"
+            assert compute.call_count == 1
+
+            book.write_text("uno y dos", encoding="utf-8")
+            orch._file_hash(book, book.stat())
+            assert compute.call_count == 2
+
+    def test_hash_del_libro_se_recupera_de_la_db_entre_ejecuciones(self, repo, tmp_path):
+        book = tmp_path / "libro.txt"
+        book.write_text("uno", encoding="utf-8")
+
+        with patch("tenlib.orchestrator._compute_hash", return_value="h1") as compute:
+            make_orchestrator(repo, make_mock_router(), tmp_path)._file_hash(book, book.stat())
+            # Un Orchestrator nuevo (otra ejecución) no vuelve a leer el archivo
+            orch = make_orchestrator(repo, make_mock_router(), tmp_path)
+            assert orch._file_hash(book, book.stat()) == "h1"
+            assert compute.call_count == 1
+
     def test_confianza_baja_produce_chunk_flaggeado(self, repo, tmp_path):
         """Chunks con confidence < 0.75 quedan FLAGGED para revisión."""
         router = make_mock_router(confidence=0.60)   # bajo el umbral
@@ -260,7 +308,7 @@ class TestOrchestrator:
         all_chunks = repo.get_all_chunks(result.book_id)
         assert all(c.status == ChunkStatus.FLAGGED for c in all_chunks)
 
-    def test_translate_actualiza_bible_en_cada_chunk(self, repo, tmp_path):
+    def test_translate_actualiza_bible_guardando_por_lotes(self, repo, tmp_path):
         router = make_mock_router(translation="María habló. Yo recordé.", confidence=0.9)
         orch = make_orchestrator(repo, router, tmp_path)
 
@@ -273,7 +321,159 @@ class TestOrchestrator:
             "SELECT COUNT(*) as c FROM bible WHERE book_id = ?",
             (result.book_id,),
         ).fetchone()
-        assert row["c"] >= 11  # 1 inicial + al menos 10 updates
+        # 1 inicial + 1 confirmada junto con el lote de los 10 chunks
+        assert row["c"] == 2
+        assert "María" in repo.get_latest_bible(result.book_id).last_scene
+
+    def test_traduccion_en_paralelo_procesa_en_orden(self, repo, tmp_path):
+        router = make_mock_router()
+        router.translate.side_effect = lambda chunk, system_prompt: ModelResponse(
+            translation   = f"T({chunk})",
+            confidence    = 0.95,
+            notes         = "ok",
+            model_used    = "gemini",
+            tokens_input  = 10,
+            tokens_output = 10,
+        )
+        orch = make_orchestrator(repo, router, tmp_path)
+        orch._max_in_flight = 4
+
+        book_file = tmp_path / "libro.txt"
+        book_file.write_text("Contenido")
+
+        result = orch.run(str(book_file), "en", "es")
+        orch.close()
+
+        assert result.translated == 10
+        chunks = repo.get_all_chunks(result.book_id)
+        assert all(c.translated == f"T({c.original})" for c in chunks)
+
+    def test_traduccion_en_paralelo_aisla_errores_por_chunk(self, repo, tmp_path):
+        ok     = make_mock_router().translate.return_value
+        router = make_mock_router()
+        router.translate.side_effect = [ok, RuntimeError("boom"), ok] + [ok] * 7
+        orch = make_orchestrator(repo, router, tmp_path)
+        orch._max_in_flight = 3
+
+        book_file = tmp_path / "libro.txt"
+        book_file.write_text("Contenido")
+
+        result = orch.run(str(book_file), "en", "es")
+        orch.close()
+
+        assert result.flagged == 1
+        assert result.translated == 9
+
+    def test_pausa_por_quota_en_paralelo_guarda_el_resto_de_la_ventana(self, repo, tmp_path):
+        """Los chunks de la ventana que sí se tradujeron no se pierden al pausar."""
+        ok     = make_mock_router().translate.return_value
+        router = make_mock_router()
+
+        def translate(chunk, system_prompt):
+            # El orden de llamada entre hilos no es fijo: falla por contenido
+            if "Chunk original 1" in chunk:
+                raise AllModelsExhaustedError("sin quota")
+            return ok
+
+        router.translate.side_effect = translate
+        orch = make_orchestrator(repo, router, tmp_path)
+        orch._max_in_flight = 4
+
+        book_file = tmp_path / "libro.txt"
+        book_file.write_text("Contenido")
+
+        result = orch.run(str(book_file), "en", "es")
+        orch.close()
+
+        statuses = [c.status for c in repo.get_all_chunks(result.book_id)]
+        assert statuses[:4] == [
+            ChunkStatus.DONE, ChunkStatus.PENDING, ChunkStatus.DONE, ChunkStatus.DONE,
+        ]
+        assert all(s == ChunkStatus.PENDING for s in statuses[4:])
+        assert router.translate.call_count == 4   # no se abre otra ventana
+
+    def test_pausa_por_quota_guarda_bible_pendiente(self, repo, tmp_path):
+        router = make_mock_router(translation="María habló. Yo recordé.", confidence=0.9)
+        ok     = router.translate.return_value
+        router.translate.side_effect = [ok, ok, ok, AllModelsExhaustedError("sin quota")]
+        orch   = make_orchestrator(repo, router, tmp_path)
+
+        book_file = tmp_path / "libro.txt"
+        book_file.write_text("Contenido")
+
+        result = orch.run(str(book_file), "en", "es")
+
+        row = repo._conn.execute(
+            "SELECT COUNT(*) as c FROM bible WHERE book_id = ?",
+            (result.book_id,),
+        ).fetchone()
+        # Los 3 chunks traducidos y su Bible se confirman juntos al pausar
+        assert row["c"] == 2
+        assert "María" in repo.get_latest_bible(result.book_id).last_scene
+        assert sum(c.status == ChunkStatus.DONE for c in repo.get_all_chunks(result.book_id)) == 3
+
+    def test_candidatos_sin_enriquecer(self):
+        from tenlib.context.bible import BookBible, _GENERIC_CHARACTER_DESCRIPTION
+        from tenlib.orchestrator import _has_unenriched_candidates
+        bible = BookBible(characters={"Kvothe": "arcanista", "Denna": _GENERIC_CHARACTER_DESCRIPTION})
+        assert _has_unenriched_candidates({}, bible) is False
+        assert _has_unenriched_candidates({"Kvothe": "x"}, bible) is False
+        assert _has_unenriched_candidates({"Kvothe": "x", "Bast": "x"}, bible) is True
+        assert _has_unenriched_candidates({"Kvothe": "x", "Denna": "x"}, bible) is True
+
+    def test_decisiones_de_estilo_igual_sin_ahocorasick(self, monkeypatch):
+        import tenlib.orchestrator as orch_module
+        notes = (
+            "Se usó una traducción literal del título. Se decidió mantener el tono "
+            "irónico. Sin equivalente. Se optó por TUTEAR entre amigos. Nombre propio intacto."
+        )
+        expected = [
+            "Se decidió mantener el tono irónico",
+            "Se optó por TUTEAR entre amigos",
+            "Nombre propio intacto",
+        ]
+        assert orch_module._extract_style_decisions(notes) == expected
+
+        monkeypatch.setattr(orch_module, "ahocorasick", None)
+        assert orch_module._extract_style_decisions(notes) == expected
+
+    def test_compression_ratio_solo_con_debug(self, repo, tmp_path, caplog):
+        router = make_mock_router(confidence=0.9)
+        orch   = make_orchestrator(repo, router, tmp_path)
+        orch._compressor.compression_ratio = MagicMock(return_value=0.5)
+
+        book_file = tmp_path / "libro.txt"
+        book_file.write_text("Contenido")
+        orch.run(str(book_file), "en", "es")
+        assert orch._compressor.compression_ratio.call_count == 0
+
+        book_file.write_text("Otro contenido")
+        with caplog.at_level("DEBUG", logger="tenlib.orchestrator"):
+            orch.run(str(book_file), "en", "es")
+        assert orch._compressor.compression_ratio.call_count == 10
+        assert "Bible comprimida" in caplog.text
+
+    def test_progreso_limitado_y_aviso_de_pausa_en_orden(self, repo, tmp_path, capsys):
+        router = make_mock_router(confidence=0.9)
+        ok     = router.translate.return_value
+        router.translate.side_effect = [ok, ok, ok, AllModelsExhaustedError("sin quota")]
+        orch   = make_orchestrator(repo, router, tmp_path)
+        orch._progress = _ProgressSink(interval=3600)
+
+        book_file = tmp_path / "libro.txt"
+        book_file.write_text("Contenido")
+        orch.run(str(book_file), "en", "es")
+
+        lines = [
+            line for line in capsys.readouterr().out.splitlines()
+            if "Traduciendo" in line or "pausado" in line
+        ]
+        # Primera línea inmediata; la 3/10 (última antes de la pausa) sale
+        # antes del aviso en vez de perderse o quedar detrás.
+        assert len(lines) == 3
+        assert "1/10" in lines[0]
+        assert "3/10" in lines[1]
+        assert "pausado" in lines[2]
 
 
 class TestOrchestratorFix:
@@ -346,6 +546,7 @@ class TestOrchestratorFix:
         repo.update_book_status(1, BookStatus.IN_PROGRESS)
 
         router.translate.reset_mock()
+        orch._chunker.chunk.reset_mock()
         result = orch.run_fix(
             original_path=str(original),
             translation_path=str(draft),
@@ -355,6 +556,15 @@ class TestOrchestratorFix:
 
         assert router.translate.call_count == 2
         assert result.was_resumed is True
+        # El original se recupera de la base de datos, sin volver a parsearlo
+        orch._chunker.chunk.assert_not_called()
+        assert "Source chunk 0" in router.translate.call_args_list[0].args[0]
+
+    def test_split_proporcional_corta_en_limite_natural(self):
+        from tenlib.orchestrator import _split_text_by_reference_lengths
+        text = "Primera frase completa. Segunda frase aquí.\nTercera línea"
+        segments = _split_text_by_reference_lengths(text, [20, 20, 15])
+        assert segments == ["Primera frase completa.", "Segunda frase aquí.", "Tercera línea"]
 
 
 class TestOrchestratorFixStyle:
@@ -394,7 +604,7 @@ class TestOrchestratorFixStyle:
         assert "TRADUCCIÓN EXISTENTE (es)" in first_payload
         assert "TEXTO ORIGINAL" not in first_payload
 
-    def test_fix_style_actualiza_bible_en_cada_chunk(self, repo, tmp_path):
+    def test_fix_style_actualiza_bible_guardando_por_lotes(self, repo, tmp_path):
         router = make_mock_router(translation="Primera frase. Segunda frase.", confidence=0.91)
         orch = make_orchestrator(repo, router, tmp_path)
 
@@ -411,7 +621,8 @@ class TestOrchestratorFixStyle:
             "SELECT COUNT(*) as c FROM bible WHERE book_id = ?",
             (result.book_id,),
         ).fetchone()
-        assert row["c"] >= 11  # 1 inicial + al menos 10 updates
+        assert row["c"] >= 2  # 1 inicial + al menos un guardado por lotes
+        assert repo.get_latest_bible(result.book_id).last_scene
 
     def test_fix_style_puebla_personajes_y_voz_narrativa(self, repo, tmp_path):
         router = make_mock_router(